@@ -0,0 +1,195 @@
+"""Планы запросов и задержки лент до и после миграции 0003_feed_indexes.
+
+Запуск из корня репозитория:
+
+    python benchmarks/feed_indexes.py --posts 2000000
+
+Скрипт создает отдельную базу SQLite (по умолчанию во временном
+каталоге), применяет миграции posts до 0002, заполняет таблицы напрямую
+через executemany, снимает EXPLAIN QUERY PLAN и медиану времени
+запросов лент, затем применяет 0003 и повторяет замеры.
+
+ANALYZE намеренно не выполняется, как и в обычной базе проекта: со
+статистикой sqlite_stat1 планировщик SQLite не учитывает LIMIT и
+начинает INNER JOIN ленты с auth_user, сортируя всю таблицу постов.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'yatube'))
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+CHUNK = 50000
+# Колонки карточки ленты на момент 0003. PostQuerySet.FEED_FIELDS с тех
+# пор выросли (updated_at, image), а таких колонок в базе до 0003 нет.
+FEED_FIELDS = (
+    'text',
+    'pub_date',
+    'author__username',
+    'author__first_name',
+    'author__last_name',
+    'group__slug',
+)
+
+
+def setup(db_path):
+    settings.configure(
+        INSTALLED_APPS=[
+            'django.contrib.auth',
+            'django.contrib.contenttypes',
+            'posts.apps.PostsConfig',
+        ],
+        DATABASES={'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': db_path,
+        }},
+        USE_TZ=True,
+        POSTS_PAGINATION='page',
+    )
+    django.setup()
+
+
+def chunks(rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def seed(posts, authors, groups, rnd):
+    from django.db import connection, transaction
+
+    now = datetime.utcnow()
+    joined = now.strftime(DATE_FORMAT)
+    span = timedelta(days=5 * 365).total_seconds()
+    users = (
+        ('!', False, f'user{i}', 'Имя', f'Фамилия {i}', '', False, True,
+         joined)
+        for i in range(authors)
+    )
+    group_rows = (
+        (f'Группа {i}', f'group-{i}', 'Описание') for i in range(groups)
+    )
+
+    def post_rows():
+        for i in range(posts):
+            pub_date = now - timedelta(seconds=rnd.random() * span)
+            # Логарифмически равномерный выбор: у первых авторов больше
+            # всего постов, как у самых активных пользователей.
+            author_id = int(authors ** rnd.random())
+            group_id = rnd.randint(1, groups) if rnd.random() < 0.7 else None
+            yield (f'Пост {i}', pub_date.strftime(DATE_FORMAT), author_id,
+                   group_id)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO auth_user (password, is_superuser, username, '
+            'first_name, last_name, email, is_staff, is_active, '
+            'date_joined) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)',
+            list(users)
+        )
+        cursor.executemany(
+            'INSERT INTO posts_group (title, slug, description) '
+            'VALUES (%s, %s, %s)',
+            list(group_rows)
+        )
+        for chunk in chunks(post_rows()):
+            cursor.executemany(
+                'INSERT INTO posts_post (text, pub_date, author_id, '
+                'group_id) VALUES (%s, %s, %s, %s)',
+                chunk
+            )
+
+
+def feed():
+    """Post.objects.feed() с явным списком колонок FEED_FIELDS."""
+    from posts.models import Post
+
+    return Post.objects.select_related('author', 'group').only(*FEED_FIELDS)
+
+
+def feed_queries():
+    from posts.models import Post
+
+    middle = Post.objects.order_by('pk').values_list(
+        'pub_date', flat=True)[Post.objects.count() // 2]
+    return {
+        'index, page 1': feed()[:10],
+        'index, page 1000': feed()[9990:10000],
+        'index, cursor': feed().filter(
+            pub_date__lt=middle).order_by('-pub_date', '-pk')[:10],
+        'group, page 1': feed().filter(group_id=1)[:10],
+        'group, page 100': feed().filter(group_id=1)[990:1000],
+        'profile, page 1': feed().filter(author_id=1)[:10],
+        'profile, page 100': feed().filter(author_id=1)[990:1000],
+    }
+
+
+def measure(title, repeat):
+    from django.db import connection
+
+    print(f'\n== {title}')
+    for name, queryset in feed_queries().items():
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = [row[-1] for row in cursor.fetchall()]
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(queryset.all())
+            timings.append((time.perf_counter() - started) * 1000)
+        print(f'{name:<20} {statistics.median(timings):10.2f} ms')
+        for line in plan:
+            print(f'{"":<20} {line}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=2000000)
+    parser.add_argument('--authors', type=int, default=10000)
+    parser.add_argument('--groups', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--db', help='путь к файлу базы (будет перезаписан)')
+    args = parser.parse_args()
+
+    directory = tempfile.TemporaryDirectory()
+    db_path = args.db or os.path.join(directory.name, 'bench.sqlite3')
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    setup(db_path)
+
+    from django.core.management import call_command
+
+    call_command('migrate', 'auth', verbosity=0)
+    call_command('migrate', 'posts', '0002', verbosity=0)
+    started = time.perf_counter()
+    seed(args.posts, args.authors, args.groups, random.Random(args.seed))
+    print(f'Seeded {args.posts} posts in '
+          f'{time.perf_counter() - started:.1f} s')
+    measure('before 0003_feed_indexes', args.repeat)
+
+    started = time.perf_counter()
+    call_command('migrate', 'posts', '0003', verbosity=0)
+    print(f'\nMigration 0003 took {time.perf_counter() - started:.1f} s')
+    measure('after 0003_feed_indexes', args.repeat)
+    directory.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""Пропускная способность чтения лент во время записи постов в SQLite.
+
+Запуск из корня репозитория:
+
+    python benchmarks/sqlite_concurrency.py --readers 4 --writers 1
+
+Для каждого режима скрипт создает отдельную базу, заполняет ее
+командой seed_posts и на --duration секунд запускает потоки: читатели
+запрашивают страницы лент (главная, группа, профиль), писатели создают
+посты через ORM, как post_create. Режим default - журнал DELETE без
+SQLITE_PRAGMAS и без CONN_MAX_AGE, tuned - настройки проекта. Каждый
+режим выполняется в отдельном процессе.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'yatube'))
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+MODES = ('default', 'tuned')
+PREFIX = 'bench'
+
+
+def setup(db_path, mode):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    settings.DATABASES['default']['NAME'] = db_path
+    if mode == 'default':
+        settings.SQLITE_PRAGMAS = {}
+        settings.DATABASES['default']['CONN_MAX_AGE'] = 0
+        settings.DATABASES['default']['OPTIONS'] = {}
+    django.setup()
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def reader(stop, stats, seed):
+    from django.db import close_old_connections
+
+    from posts.models import Group, Post, User
+
+    rnd = random.Random(seed)
+    group_ids = list(Group.objects.values_list('id', flat=True))
+    author_ids = list(User.objects.values_list('id', flat=True)[:100])
+    while not stop.is_set():
+        # Как обработчик запроса: соединение закрывается или остается
+        # в зависимости от CONN_MAX_AGE.
+        close_old_connections()
+        feed = rnd.choice((
+            Post.objects.feed(),
+            Post.objects.feed().filter(group_id=rnd.choice(group_ids)),
+            Post.objects.feed().filter(author_id=rnd.choice(author_ids)),
+        ))
+        offset = rnd.randrange(0, 100) * 10
+        started = time.perf_counter()
+        try:
+            list(feed[offset:offset + 10])
+        except Exception as error:
+            stats['errors'].append(str(error))
+            continue
+        stats['reads'].append(time.perf_counter() - started)
+    close_old_connections()
+
+
+def writer(stop, stats, seed):
+    from django.db import close_old_connections
+
+    from posts.models import Post, User
+
+    rnd = random.Random(seed)
+    author_ids = list(User.objects.values_list('id', flat=True)[:100])
+    while not stop.is_set():
+        close_old_connections()
+        started = time.perf_counter()
+        try:
+            Post.objects.create(author_id=rnd.choice(author_ids),
+                                text='Новый пост о погоде')
+        except Exception as error:
+            stats['errors'].append(str(error))
+            continue
+        stats['writes'].append(time.perf_counter() - started)
+    close_old_connections()
+
+
+def run_mode(args):
+    """Замер одного режима; печатает результат в JSON."""
+    directory = tempfile.TemporaryDirectory()
+    setup(os.path.join(directory.name, 'bench.sqlite3'), args.mode)
+
+    from django.core.management import call_command
+    from django.db import connection
+
+    call_command('migrate', verbosity=0)
+    call_command('seed_posts', posts=args.posts, users=1000, groups=50,
+                 prefix=PREFIX, verbosity=0, stdout=open(os.devnull, 'w'))
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode')
+        journal = cursor.fetchone()[0]
+    connection.close()
+
+    stats = {'reads': [], 'writes': [], 'errors': []}
+    stop = threading.Event()
+    threads = [threading.Thread(target=reader, args=(stop, stats, i))
+               for i in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(stop, stats, -i))
+                for i in range(1, args.writers + 1)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    directory.cleanup()
+
+    def summary(timings):
+        if not timings:
+            return {'count': 0}
+        return {
+            'count': len(timings),
+            'per_second': round(len(timings) / args.duration, 1),
+            'p50_ms': round(statistics.median(timings) * 1000, 3),
+            'p99_ms': round(percentile(timings, 0.99) * 1000, 3),
+        }
+
+    print(json.dumps({
+        'mode': args.mode,
+        'journal_mode': journal,
+        'reads': summary(stats['reads']),
+        'writes': summary(stats['writes']),
+        'errors': len(stats['errors']),
+        'first_error': stats['errors'][0] if stats['errors'] else None,
+    }, ensure_ascii=False))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=1)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--mode', choices=MODES,
+                        help='замерить один режим в этом процессе')
+    args = parser.parse_args()
+    if args.mode:
+        run_mode(args)
+        return
+    for mode in MODES:
+        output = subprocess.run(
+            [sys.executable, __file__, '--mode', mode,
+             '--posts', str(args.posts), '--readers', str(args.readers),
+             '--writers', str(args.writers),
+             '--duration', str(args.duration)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        reads, writes = result['reads'], result['writes']
+        print(f'{mode:<8} journal={result["journal_mode"]:<7} '
+              f'reads {reads.get("per_second", 0):>8}/s '
+              f'p99 {reads.get("p99_ms", "-")} ms  '
+              f'writes {writes.get("per_second", 0):>6}/s '
+              f'p99 {writes.get("p99_ms", "-")} ms  '
+              f'errors {result["errors"]}')
+        if result['first_error']:
+            print(f'{"":<8} {result["first_error"]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+"""Задержки и число запросов всех страниц posts, users и about.
+
+Запуск из корня репозитория:
+
+    python benchmarks/view_latency.py --output results.json
+    python benchmarks/view_latency.py --compare results.json
+
+Скрипт создает отдельную базу SQLite с настройками проекта, заполняет
+ее командой seed_posts (авторы со степенным распределением числа
+постов, много групп) и обходит все маршруты posts.urls, users.urls
+и about.urls тестовым клиентом Django.
+Для каждого случая сохраняются перцентили задержки и число SQL-запросов
+первого (холодный кэш) и повторного запроса.
+
+С --compare результаты сравниваются с прошлым запуском: скрипт
+завершается с кодом 1, если медиана выросла больше чем на --threshold
+(и на --min-delta мс) или страница стала делать больше запросов.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, 'yatube'))
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+PREFIX = 'bench'
+STAFF_USERNAME = f'{PREFIX}_user1'
+STAFF_PASSWORD = 'benchmark'
+URLCONFS = ('posts.urls', 'users.urls', 'about.urls')
+# Выход из аккаунта сбрасывает сессию клиента, подписки принимают
+# только POST - их не замеряем.
+SKIP_ROUTES = {'users:logout', 'posts:profile_follow',
+               'posts:profile_unfollow'}
+PAGINATED_ROUTES = {'posts:index', 'posts:group_posts', 'posts:profile'}
+QUERY_ROUTES = {'posts:post_search': 'q=погода'}
+
+
+def setup(db_path):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    settings.DATABASES['default']['NAME'] = db_path
+    settings.DEBUG = False
+    django.setup()
+
+
+def seed(args):
+    """Данные командой seed_posts; самый активный автор - сотрудник."""
+    from django.core.management import call_command
+
+    from posts.models import User
+
+    call_command('seed_posts', posts=args.posts, users=args.authors,
+                 groups=args.groups, seed=args.seed, prefix=PREFIX,
+                 verbosity=0, stdout=open(os.devnull, 'w'))
+    user = User.objects.get(username=STAFF_USERNAME)
+    user.set_password(STAFF_PASSWORD)
+    user.is_staff = user.is_superuser = True
+    user.save()
+
+
+def sample_kwargs():
+    """Значения параметров маршрутов: самые большие и маленькие объекты."""
+    from django.db.models import Count
+
+    from posts.models import Group, Post, User
+
+    authors = User.objects.annotate(total=Count('posts')).order_by('-total')
+    groups = Group.objects.annotate(total=Count('posts')).order_by('-total')
+    post = Post.objects.filter(
+        author__username=STAFF_USERNAME).order_by('pk')[0]
+    return {
+        'username': {'heavy': authors[0].username,
+                     'light': authors.reverse()[0].username},
+        'slug': {'heavy': groups[0].slug,
+                 'light': groups.reverse()[0].slug},
+        'post_id': {'': post.pk},
+    }
+
+
+def cases():
+    """Пары (название, адрес) для каждого маршрута и его параметров."""
+    from django.urls import URLPattern, get_resolver, reverse
+
+    samples = sample_kwargs()
+    for urlconf in URLCONFS:
+        resolver = get_resolver(urlconf)
+        namespace = resolver.urlconf_module.app_name
+        for pattern in resolver.url_patterns:
+            if not isinstance(pattern, URLPattern):
+                continue
+            name = f'{namespace}:{pattern.name}'
+            if name in SKIP_ROUTES:
+                continue
+            variants = {'': {}}
+            if pattern.pattern.converters:
+                argument, = pattern.pattern.converters
+                variants = {label: {argument: value}
+                            for label, value in samples[argument].items()}
+            for label, kwargs in variants.items():
+                case = f'{name} [{label}]' if label else name
+                url = reverse(name, kwargs=kwargs)
+                yield case, url
+                if name in PAGINATED_ROUTES:
+                    yield f'{case} ?page=50', f'{url}?page=50'
+                if name in QUERY_ROUTES:
+                    yield f'{case} ?{QUERY_ROUTES[name]}', (
+                        f'{url}?{QUERY_ROUTES[name]}')
+
+
+def request(client, url):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        response = client.get(url)
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        elapsed = (time.perf_counter() - started) * 1000
+    return response, elapsed, len(queries)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def measure(repeat):
+    from django.core.cache import cache
+    from django.test import Client
+
+    anonymous = Client()
+    authorized = Client()
+    authorized.login(username=STAFF_USERNAME, password=STAFF_PASSWORD)
+    results = {}
+    for case, url in cases():
+        cache.clear()
+        client = anonymous
+        response, cold, cold_queries = request(client, url)
+        if response.status_code == 302 and 'login' in response.url:
+            client = authorized
+            cache.clear()
+            response, cold, cold_queries = request(client, url)
+        timings, queries = [], 0
+        for _ in range(repeat):
+            response, elapsed, queries = request(client, url)
+            timings.append(elapsed)
+        results[case] = {
+            'url': url,
+            'status': response.status_code,
+            'authorized': client is authorized,
+            'cold_ms': round(cold, 3),
+            'p50_ms': round(statistics.median(timings), 3),
+            'p90_ms': round(percentile(timings, 0.9), 3),
+            'p99_ms': round(percentile(timings, 0.99), 3),
+            'max_ms': round(max(timings), 3),
+            'cold_queries': cold_queries,
+            'queries': queries,
+        }
+        print(f'{case:<45} {results[case]["status"]} '
+              f'p50 {results[case]["p50_ms"]:8.2f} ms  '
+              f'p99 {results[case]["p99_ms"]:8.2f} ms  '
+              f'queries {cold_queries}/{queries}')
+    return results
+
+
+def compare(results, baseline, threshold, min_delta):
+    """Список регрессий относительно baseline."""
+    regressions = []
+    for case, old in baseline['results'].items():
+        new = results.get(case)
+        if new is None:
+            continue
+        delta = new['p50_ms'] - old['p50_ms']
+        if delta > min_delta and delta > old['p50_ms'] * threshold:
+            regressions.append(
+                f'{case}: p50 {old["p50_ms"]:.2f} -> {new["p50_ms"]:.2f} ms')
+        for field in ('cold_queries', 'queries'):
+            if new[field] > old[field]:
+                regressions.append(
+                    f'{case}: {field} {old[field]} -> {new[field]}')
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--authors', type=int, default=2000)
+    parser.add_argument('--groups', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--db', help='путь к файлу базы (будет перезаписан)')
+    parser.add_argument('--output', help='куда записать результаты в JSON')
+    parser.add_argument('--compare', help='JSON прошлого запуска')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='допустимый относительный рост медианы')
+    parser.add_argument('--min-delta', type=float, default=1.0,
+                        help='рост медианы в мс, который не считается '
+                             'регрессией')
+    args = parser.parse_args()
+
+    directory = tempfile.TemporaryDirectory()
+    db_path = args.db or os.path.join(directory.name, 'bench.sqlite3')
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    setup(db_path)
+
+    from django.core.management import call_command
+
+    call_command('migrate', verbosity=0)
+    started = time.perf_counter()
+    seed(args)
+    print(f'Seeded {args.posts} posts in '
+          f'{time.perf_counter() - started:.1f} s')
+
+    results = measure(args.repeat)
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'date': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'posts': args.posts,
+            'authors': args.authors,
+            'groups': args.groups,
+            'repeat': args.repeat,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+    directory.cleanup()
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.threshold,
+                              args.min_delta)
+        if regressions:
+            print(f'\nРегрессии относительно {baseline["meta"]["commit"]}:')
+            print('\n'.join(regressions))
+            sys.exit(1)
+        print(f'\nРегрессий относительно {baseline["meta"]["commit"]} нет')
+
+
+if __name__ == '__main__':
+    main()
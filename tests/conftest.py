@@ -1,4 +1,8 @@
 import os
+import shutil
+import tempfile
+
+import pytest
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 root_dir_content = os.listdir(BASE_DIR)
@@ -37,3 +41,22 @@ pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
 ]
+
+
+@pytest.fixture(autouse=True, scope='session')
+def temp_media_root():
+    """Картинки mixer и миниатюры пишутся во временный каталог."""
+    from django.test import override_settings
+    media_root = tempfile.mkdtemp()
+    caches = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'thumbnails': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'thumbnails',
+        },
+    }
+    with override_settings(MEDIA_ROOT=media_root, CACHES=caches):
+        yield media_root
+    shutil.rmtree(media_root, ignore_errors=True)
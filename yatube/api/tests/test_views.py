@@ -0,0 +1,91 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class ApiViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='auth', first_name='Лев', last_name='Толстой')
+        cls.group = Group.objects.create(title='Группа', slug='slug',
+                                         description='Описание')
+        for i in range(15):
+            Post.objects.create(author=cls.author, text=f'Пост {i}',
+                                group=cls.group if i % 2 else None)
+        cls.posts = list(Post.objects.order_by('-pub_date', '-pk'))
+
+    def test_posts_cursor_pagination(self):
+        url = reverse('api:post_list')
+        first = self.client.get(url, {'limit': 10}).json()
+        self.assertEqual([post['id'] for post in first['results']],
+                         [post.pk for post in self.posts[:10]])
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).json()
+        self.assertEqual([post['id'] for post in second['results']],
+                         [post.pk for post in self.posts[10:]])
+        self.assertIsNone(second['next'])
+        back = self.client.get(second['previous']).json()
+        self.assertEqual(back['results'], first['results'])
+
+    def test_one_query_per_page_with_joined_data(self):
+        with self.assertNumQueries(1):
+            data = self.client.get(reverse('api:post_list')).json()
+        post = next(post for post in data['results'] if post['group'])
+        self.assertEqual(post['author'], {
+            'username': 'auth', 'first_name': 'Лев', 'last_name': 'Толстой'})
+        self.assertEqual(post['group'], {'slug': 'slug', 'title': 'Группа'})
+
+    def test_fields_limit_selected_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(reverse('api:post_list'),
+                                   {'fields': 'id,text'}).json()
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        sql = queries[0]['sql']
+        self.assertNotIn('auth_user', sql)
+        self.assertNotIn('updated_at', sql)
+
+    def test_unknown_field(self):
+        response = self.client.get(reverse('api:post_list'),
+                                   {'fields': 'text,password'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn('password', response.json()['detail'])
+
+    def test_group_and_author_endpoints(self):
+        group = self.client.get(reverse('api:group_detail',
+                                        args=['slug'])).json()
+        self.assertEqual(group['description'], 'Описание')
+        self.assertEqual(
+            len(self.client.get(reverse('api:group_list')).json()['results']),
+            1)
+        posts = self.client.get(reverse('api:group_posts', args=['slug']),
+                                {'fields': 'group'}).json()['results']
+        self.assertEqual(len(posts), 7)
+        author = self.client.get(reverse('api:author_detail',
+                                         args=['auth'])).json()
+        self.assertEqual(author['posts_count'], 15)
+        posts = self.client.get(reverse('api:author_posts', args=['auth']),
+                                {'limit': 100}).json()['results']
+        self.assertEqual(len(posts), 15)
+
+    def test_post_detail(self):
+        post = self.posts[0]
+        data = self.client.get(reverse('api:post_detail',
+                                       args=[post.pk])).json()
+        self.assertEqual(data['text'], post.text)
+        response = self.client.get(reverse('api:post_detail', args=[0]))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_read_only(self):
+        response = self.client.post(reverse('api:post_list'))
+        self.assertEqual(response.status_code,
+                         HTTPStatus.METHOD_NOT_ALLOWED)
@@ -0,0 +1,179 @@
+from functools import wraps
+
+from django.http import JsonResponse
+from django.views.decorators.http import require_safe
+
+from posts.models import Group, Post, User, get_posts_count
+from posts.utils import CURSOR_PARAM, get_cursor_page
+
+PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+# Публичное имя поля поста -> колонки, которые выбираются из базы.
+POST_FIELDS = {
+    'id': (),
+    'text': ('text',),
+    'pub_date': ('pub_date',),
+    'updated_at': ('updated_at',),
+    'author': ('author__username', 'author__first_name',
+               'author__last_name'),
+    'group': ('group__slug', 'group__title'),
+}
+GROUP_FIELDS = ('id', 'title', 'slug', 'description')
+
+
+class ApiError(Exception):
+    def __init__(self, detail, status=400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status = status
+
+
+def api_view(view):
+    """Только GET/HEAD, ошибки - JSON вида {"detail": ...}."""
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except ApiError as error:
+            return JsonResponse({'detail': error.detail},
+                                status=error.status)
+    return wrapper
+
+
+def get_or_404(queryset, **lookup):
+    obj = queryset.filter(**lookup).first()
+    if obj is None:
+        raise ApiError('Не найдено.', status=404)
+    return obj
+
+
+def requested_fields(request):
+    """Поля из параметра fields=; по умолчанию все."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(POST_FIELDS)
+    fields = [field.strip() for field in raw.split(',') if field.strip()]
+    unknown = set(fields) - POST_FIELDS.keys()
+    if unknown:
+        raise ApiError('Неизвестные поля: ' + ', '.join(sorted(unknown)))
+    return list(dict.fromkeys(fields))
+
+
+def select_fields(queryset, fields):
+    """Ограничивает SELECT колонками fields и нужными для курсора.
+
+    Автор и группа подтягиваются тем же запросом через JOIN.
+    """
+    related = [field for field in ('author', 'group') if field in fields]
+    columns = {'pub_date'}
+    for field in fields:
+        columns.update(POST_FIELDS[field])
+    if related:
+        queryset = queryset.select_related(*related)
+    return queryset.only(*columns)
+
+
+def serialize_post(post, fields):
+    data = {}
+    for field in fields:
+        if field == 'author':
+            data['author'] = {
+                'username': post.author.username,
+                'first_name': post.author.first_name,
+                'last_name': post.author.last_name,
+            }
+        elif field == 'group':
+            data['group'] = post.group and {
+                'slug': post.group.slug,
+                'title': post.group.title,
+            }
+        elif field == 'id':
+            data['id'] = post.pk
+        else:
+            data[field] = getattr(post, field)
+    return data
+
+
+def serialize_group(group):
+    return {field: getattr(group, field) for field in GROUP_FIELDS}
+
+
+def page_size(request):
+    try:
+        size = int(request.GET.get('limit', PAGE_SIZE))
+    except ValueError:
+        raise ApiError('limit должен быть числом.')
+    return min(max(size, 1), MAX_PAGE_SIZE)
+
+
+def page_url(request, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params[CURSOR_PARAM] = cursor
+    return request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+
+
+def posts_response(request, queryset):
+    """Страница постов с курсорами на соседние страницы по (pub_date, id)."""
+    fields = requested_fields(request)
+    page = get_cursor_page(select_fields(queryset, fields),
+                           request.GET.get(CURSOR_PARAM), page_size(request))
+    return JsonResponse({
+        'next': page_url(request, page.next_cursor),
+        'previous': page_url(request, page.previous_cursor),
+        'results': [serialize_post(post, fields) for post in page],
+    }, json_dumps_params={'ensure_ascii': False})
+
+
+@api_view
+def post_list(request):
+    return posts_response(request, Post.objects.all())
+
+
+@api_view
+def post_detail(request, post_id):
+    fields = requested_fields(request)
+    post = get_or_404(select_fields(Post.objects.all(), fields), pk=post_id)
+    return JsonResponse(serialize_post(post, fields),
+                        json_dumps_params={'ensure_ascii': False})
+
+
+@api_view
+def group_list(request):
+    groups = Group.objects.order_by('title').only(*GROUP_FIELDS)
+    return JsonResponse({'results': [serialize_group(group)
+                                     for group in groups]},
+                        json_dumps_params={'ensure_ascii': False})
+
+
+@api_view
+def group_detail(request, slug):
+    group = get_or_404(Group.objects.only(*GROUP_FIELDS), slug=slug)
+    return JsonResponse(serialize_group(group),
+                        json_dumps_params={'ensure_ascii': False})
+
+
+@api_view
+def group_posts(request, slug):
+    group = get_or_404(Group.objects.only('id'), slug=slug)
+    return posts_response(request, group.posts.all())
+
+
+@api_view
+def author_detail(request, username):
+    author = get_or_404(User.objects.select_related('post_stats'),
+                        username=username)
+    return JsonResponse({
+        'username': author.username,
+        'first_name': author.first_name,
+        'last_name': author.last_name,
+        'posts_count': get_posts_count(author),
+    }, json_dumps_params={'ensure_ascii': False})
+
+
+@api_view
+def author_posts(request, username):
+    author = get_or_404(User.objects.only('id'), username=username)
+    return posts_response(request, author.posts.all())
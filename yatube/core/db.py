@@ -0,0 +1,33 @@
+"""Настройка соединений с базой: PRAGMA для SQLite и проверка
+постоянных соединений перед запросом."""
+from django.conf import settings
+from django.db import connections
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Применяет SQLITE_PRAGMAS к каждому новому соединению SQLite.
+
+    journal_mode = wal хранится в самом файле базы, остальные PRAGMA
+    действуют только на это соединение.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def close_unusable_connections(sender, **kwargs):
+    """Закрывает сломанные постоянные соединения в начале запроса.
+
+    Аналог CONN_HEALTH_CHECKS из новых версий Django: соединение,
+    оставшееся от прошлого запроса (CONN_MAX_AGE), проверяется до
+    того, как представление успеет получить ошибку.
+    """
+    if not settings.DATABASE_HEALTH_CHECKS:
+        return
+    for connection in connections.all():
+        if (connection.connection is not None
+                and not connection.in_atomic_block
+                and not connection.is_usable()):
+            connection.close()
@@ -0,0 +1,86 @@
+"""Чтение с реплик для выбранных GET-представлений.
+
+Реплики перечислены в DATABASE_REPLICAS. По умолчанию все запросы
+идут в default; с реплики читают только представления с декоратором
+@replica_reads. После любого POST браузер на REPLICA_PIN_SECONDS
+закрепляется за основной базой (cookie REPLICA_PIN_COOKIE), чтобы
+автор сразу видел свой пост, даже если реплика отстает.
+"""
+import random
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+
+PRIMARY = 'default'
+SAFE_METHODS = ('GET', 'HEAD')
+
+# Реплика, с которой читает текущий запрос; None - основная база.
+read_alias = ContextVar('read_alias', default=None)
+
+
+def pinned_to_primary(request):
+    return settings.REPLICA_PIN_COOKIE in request.COOKIES
+
+
+def reading_from_replica():
+    return read_alias.get() is not None
+
+
+def replica_reads(view):
+    """Разрешает представлению читать с реплики.
+
+    Реплика выбирается один раз на запрос, чтобы все его выборки
+    видели одно состояние базы. Декоратор должен быть внешним: тогда
+    ETag и ключ кэша страницы (posts.cache.conditional_page) читаются
+    с той же реплики, что и содержимое, и отставшая реплика не
+    сохранит старую страницу под ключом новой версии.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (not settings.DATABASE_REPLICAS
+                or request.method not in SAFE_METHODS
+                or pinned_to_primary(request)):
+            return view(request, *args, **kwargs)
+        token = read_alias.set(random.choice(settings.DATABASE_REPLICAS))
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            read_alias.reset(token)
+    return wrapper
+
+
+class ReplicaRouter:
+    """Запись и миграции - в основную базу, чтение - с реплики, если
+    ее выбрал @replica_reads."""
+
+    def db_for_read(self, model, **hints):
+        return read_alias.get() or PRIMARY
+
+    def db_for_write(self, model, **hints):
+        # Запись посреди запроса: дальше читаем свои же данные.
+        read_alias.set(None)
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплики получают схему вместе с данными из основной базы.
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaPinMiddleware:
+    """Ставит cookie закрепления за основной базой после POST и
+    других изменяющих запросов."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if settings.DATABASE_REPLICAS and request.method not in SAFE_METHODS:
+            response.set_cookie(settings.REPLICA_PIN_COOKIE, '1',
+                                max_age=settings.REPLICA_PIN_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,49 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from core.memory_profiling import measure_memory
+
+
+class Command(BaseCommand):
+    help = ('Запрашивает адреса в этом процессе и показывает пик и '
+            'остаток памяти (tracemalloc) и главные места выделений')
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='*')
+        parser.add_argument('--file', help='файл со списком адресов')
+        parser.add_argument('--user', help='войти как этот пользователь')
+        parser.add_argument('--repeat', type=int, default=1,
+                            help='сколько раз запросить каждый адрес')
+        parser.add_argument('--top', type=int, default=5)
+
+    def handle(self, *args, **options):
+        urls = list(options['urls'])
+        if options['file']:
+            with open(options['file'], encoding='utf-8') as file:
+                urls += [line.strip() for line in file
+                         if line.strip() and not line.startswith('#')]
+        if not urls:
+            raise CommandError('Нужен хотя бы один адрес')
+        client = Client()
+        if options['user']:
+            user = get_user_model().objects.filter(
+                username=options['user']).first()
+            if user is None:
+                raise CommandError(f'Нет пользователя {options["user"]}')
+            client.force_login(user)
+        for url in urls:
+            for _ in range(options['repeat']):
+                with measure_memory(options['top']) as report:
+                    response = client.get(url)
+                    if response.streaming:
+                        for _ in response.streaming_content:
+                            pass
+                self.stdout.write(
+                    f'{url} {response.status_code} '
+                    f'peak {report.peak / 1024:.1f} KiB, '
+                    f'retained {report.retained / 1024:.1f} KiB'
+                )
+                for site, size, count in report.top:
+                    self.stdout.write(
+                        f'    {size / 1024:10.1f} KiB {count:7d} {site}')
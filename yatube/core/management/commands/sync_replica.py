@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.db_router import PRIMARY
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в файлы реплик: замена '
+            'репликации для локальной проверки DATABASE_REPLICAS')
+
+    def add_arguments(self, parser):
+        parser.add_argument('aliases', nargs='*',
+                            help='реплики; по умолчанию DATABASE_REPLICAS')
+
+    def handle(self, *args, **options):
+        aliases = options['aliases'] or settings.DATABASE_REPLICAS
+        if not aliases:
+            raise CommandError('DATABASE_REPLICAS пуст, укажите реплику')
+        primary = connections[PRIMARY]
+        for alias in aliases:
+            if alias not in settings.DATABASES or alias == PRIMARY:
+                raise CommandError(f'{alias}: не реплика')
+            replica = connections[alias]
+            if primary.vendor != 'sqlite' or replica.vendor != 'sqlite':
+                raise CommandError('Копировать можно только SQLite')
+            primary.ensure_connection()
+            replica.ensure_connection()
+            # Онлайн-копия: основная база остается доступной.
+            primary.connection.backup(replica.connection)
+            self.stdout.write(self.style.SUCCESS(
+                f'{alias}: {replica.settings_dict["NAME"]} обновлена'))
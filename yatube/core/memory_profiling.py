@@ -0,0 +1,112 @@
+import linecache
+import logging
+import tracemalloc
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+logger = logging.getLogger('core.memory_profiling')
+
+TRACE_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, linecache.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+)
+# Наибольший пик по имени представления с момента запуска процесса.
+VIEW_PEAKS = {}
+# tracemalloc.reset_peak() есть только с Python 3.9.
+reset_peak = getattr(tracemalloc, 'reset_peak', None)
+
+
+class MemoryReport:
+    """Память, выделенная за время блока measure_memory(), в байтах.
+
+    peak - максимум сверх уровня до начала блока, retained - сколько
+    осталось занято в конце блока, top - места в коде, чьи выделения
+    еще живы в конце блока (для запроса - пока жив ответ), по убыванию:
+    список (файл:строка, байты, число блоков).
+    """
+    peak = 0
+    retained = 0
+    top = ()
+
+    def format_top(self):
+        return '; '.join(f'{site} +{size / 1024:.1f} KiB'
+                         for site, size, count in self.top)
+
+
+@contextmanager
+def measure_memory(top=10):
+    """Измеряет память блока через tracemalloc.
+
+    tracemalloc считает выделения всего процесса, поэтому в
+    многопоточном сервере в отчет попадут и соседние запросы.
+    """
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    elif reset_peak is None:
+        # Без reset_peak() пик сбрасывается только перезапуском
+        # трассировки; выделения до блока при этом забываются, но для
+        # разницы до и после блока они и не нужны.
+        limit = tracemalloc.get_traceback_limit()
+        tracemalloc.stop()
+        tracemalloc.start(limit)
+    report = MemoryReport()
+    before = tracemalloc.take_snapshot().filter_traces(TRACE_FILTERS)
+    baseline = tracemalloc.get_traced_memory()[0]
+    if reset_peak is not None:
+        reset_peak()
+    try:
+        yield report
+    finally:
+        current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot().filter_traces(TRACE_FILTERS)
+        if started:
+            tracemalloc.stop()
+        report.peak = peak - baseline
+        report.retained = current - baseline
+        report.top = [
+            (f'{stat.traceback[0].filename}:{stat.traceback[0].lineno}',
+             stat.size_diff, stat.count_diff)
+            for stat in after.compare_to(before, 'lineno')[:top]
+            if stat.size_diff > 0
+        ]
+
+
+class MemoryProfilingMiddleware:
+    """Пик памяти и главные места выделений для каждого представления.
+
+    Включается MEMORY_PROFILING; замедляет запросы в разы, поэтому
+    предназначен для отладки, а не для production. Пишет строку в
+    логгер core.memory_profiling, заголовок X-Memory-Peak (KiB) и
+    запоминает наибольший пик представления в VIEW_PEAKS.
+    """
+
+    def __init__(self, get_response):
+        if not settings.MEMORY_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with measure_memory(settings.MEMORY_PROFILING_TOP) as report:
+            response = self.get_response(request)
+        match = request.resolver_match
+        view_name = match.view_name if match else None
+        VIEW_PEAKS[view_name] = max(VIEW_PEAKS.get(view_name, 0),
+                                    report.peak)
+        response['X-Memory-Peak'] = f'{report.peak / 1024:.1f}'
+        logger.info(
+            'view=%s path=%s peak_kib=%.1f retained_kib=%.1f top=%s',
+            view_name, request.path, report.peak / 1024,
+            report.retained / 1024, report.format_top(),
+            extra={'memory': {
+                'view': view_name,
+                'peak': report.peak,
+                'retained': report.retained,
+                'top': report.top,
+            }},
+        )
+        return response
@@ -0,0 +1,117 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import time
+import uuid
+
+from django.conf import settings
+
+CAPTURE_ID = re.compile(r'^\d{8}-\d{6}-[0-9a-f]{8}$')
+SORT_KEYS = ('cumulative', 'tottime', 'ncalls')
+
+
+class ProfileStore:
+    """Каталог с профилями запросов: <id>.prof (pstats) и <id>.json.
+
+    Хранит не больше max_captures профилей, при переполнении удаляет
+    самые старые.
+    """
+
+    def __init__(self, directory=None, max_captures=None):
+        self.directory = directory or settings.PROFILE_DIR
+        self.max_captures = max_captures or settings.PROFILE_MAX_CAPTURES
+
+    def path(self, capture_id, extension='prof'):
+        if not CAPTURE_ID.match(capture_id):
+            raise KeyError(capture_id)
+        return os.path.join(self.directory, f'{capture_id}.{extension}')
+
+    def save(self, profile, meta):
+        os.makedirs(self.directory, exist_ok=True)
+        capture_id = (time.strftime('%Y%m%d-%H%M%S')
+                      + f'-{uuid.uuid4().hex[:8]}')
+        profile.dump_stats(self.path(capture_id))
+        with open(self.path(capture_id, 'json'), 'w',
+                  encoding='utf-8') as file:
+            json.dump({'id': capture_id, **meta}, file, ensure_ascii=False)
+        self.prune()
+        return capture_id
+
+    def ids(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted((name[:-len('.json')]
+                       for name in os.listdir(self.directory)
+                       if name.endswith('.json')
+                       and CAPTURE_ID.match(name[:-len('.json')])),
+                      reverse=True)
+
+    def prune(self):
+        for capture_id in self.ids()[self.max_captures:]:
+            self.delete(capture_id)
+
+    def delete(self, capture_id):
+        for extension in ('prof', 'json'):
+            try:
+                os.remove(self.path(capture_id, extension))
+            except FileNotFoundError:
+                pass
+
+    def meta(self, capture_id):
+        try:
+            with open(self.path(capture_id, 'json'),
+                      encoding='utf-8') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            raise KeyError(capture_id)
+
+    def captures(self):
+        return [self.meta(capture_id) for capture_id in self.ids()]
+
+    def top_functions(self, capture_id, sort='cumulative', limit=40):
+        """Текстовый отчет pstats по самым дорогим функциям."""
+        if sort not in SORT_KEYS:
+            sort = SORT_KEYS[0]
+        stream = io.StringIO()
+        stats = pstats.Stats(self.path(capture_id), stream=stream)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+
+def profile_requested(request):
+    return (settings.PROFILE_PARAM in request.GET
+            or request.META.get('HTTP_X_PROFILE') == '1')
+
+
+class ProfilingMiddleware:
+    """Снимает cProfile одного запроса по флагу от сотрудника.
+
+    Профиль пишется, если в адресе есть параметр PROFILE_PARAM или
+    передан заголовок X-Profile: 1, а пользователь - staff. Номер
+    сохраненного профиля возвращается в заголовке X-Profile-Id.
+    Остальные запросы проходят без профилировщика.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not (profile_requested(request) and request.user.is_staff):
+            return self.get_response(request)
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        response = profile.runcall(self.get_response, request)
+        duration = time.perf_counter() - started
+        capture_id = ProfileStore().save(profile, {
+            'method': request.method,
+            'path': request.get_full_path(),
+            'user': request.user.get_username(),
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 3),
+            'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        })
+        response['X-Profile-Id'] = capture_id
+        return response
@@ -0,0 +1,126 @@
+import logging
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('core.query_budget')
+
+MODES = ('log', 'raise')
+# Сколько повторяющихся запросов показывать в отчете.
+REPEATED_LIMIT = 5
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryCounter:
+    """execute_wrapper, запоминающий SQL каждого выполненного запроса."""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.statements.append(sql)
+        return execute(sql, params, many, context)
+
+    def __len__(self):
+        return len(self.statements)
+
+    def repeated(self):
+        """Запросы, выполненные больше одного раза - признак N+1."""
+        return [(sql, count) for sql, count
+                in Counter(self.statements).most_common(REPEATED_LIMIT)
+                if count > 1]
+
+    def report(self, budget):
+        lines = [f'{len(self)} SQL-запросов при бюджете {budget}']
+        lines += [f'  {count} x {sql}' for sql, count in self.repeated()]
+        return '\n'.join(lines)
+
+
+@contextmanager
+def count_queries():
+    """Считает запросы ко всем базам, включая реплики."""
+    counter = QueryCounter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        yield counter
+
+
+def query_budget(max_queries):
+    """Объявляет, сколько SQL-запросов может выполнить представление.
+
+    Бюджет проверяет QueryBudgetMiddleware; запросы сессии и
+    пользователя в него не входят.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            return view(request, *args, **kwargs)
+        wrapper.query_budget = max_queries
+        return wrapper
+    return decorator
+
+
+class QueryBudgetMiddleware:
+    """Пишет в лог или отклоняет запросы сверх бюджета представления.
+
+    Режим задается QUERY_BUDGET_MODE: 'log', 'raise' или None - тогда
+    middleware отключается. Представления без @query_budget проверяются
+    по QUERY_BUDGET_DEFAULT, если он задан. Запросы при чтении
+    StreamingHttpResponse не учитываются.
+    """
+
+    def __init__(self, get_response):
+        self.mode = settings.QUERY_BUDGET_MODE
+        if self.mode is None:
+            raise MiddlewareNotUsed
+        if self.mode not in MODES:
+            raise ValueError(f'QUERY_BUDGET_MODE: {self.mode!r}')
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        counter = getattr(request, '_query_counter', None)
+        if counter is None:
+            return response
+        for connection in connections.all():
+            connection.execute_wrappers.remove(counter)
+        budget = request._query_budget
+        if len(counter) > budget:
+            message = f'{request.path}: {counter.report(budget)}'
+            if self.mode == 'raise':
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        budget = getattr(view_func, 'query_budget',
+                         settings.QUERY_BUDGET_DEFAULT)
+        if budget is None:
+            return None
+        # Сессия и пользователь загружаются до начала подсчета.
+        request.user.is_authenticated
+        request._query_budget = budget
+        request._query_counter = QueryCounter()
+        for connection in connections.all():
+            connection.execute_wrappers.append(request._query_counter)
+        return None
+
+
+class QueryBudgetTestMixin:
+    """assertQueryBudget для TestCase: как assertNumQueries, но проверяет
+    верхнюю границу и показывает повторяющиеся запросы."""
+
+    @contextmanager
+    def assertQueryBudget(self, max_queries):
+        with count_queries() as counter:
+            yield counter
+        if len(counter) > max_queries:
+            self.fail(counter.report(max_queries))
@@ -0,0 +1,115 @@
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('core.server_timing')
+
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Время SQL и отрисовки шаблонов одного запроса, в секундах.
+
+    Служит execute_wrapper для соединений с базой. SQL, выполненный
+    во время отрисовки (ленивые queryset в шаблонах), учитывается
+    в template_db, чтобы db, шаблоны и Python не пересекались.
+    """
+
+    def __init__(self):
+        self.db = 0.0
+        self.queries = 0
+        self.template = 0.0
+        self.template_db = 0.0
+        self.template_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.db += elapsed
+            self.queries += 1
+            if self.template_depth:
+                self.template_db += elapsed
+
+    @contextmanager
+    def template_render(self):
+        """Засекает время только внешнего шаблона, без вложенных."""
+        self.template_depth += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.template_depth -= 1
+            if not self.template_depth:
+                self.template += time.perf_counter() - started
+
+
+def current_timings():
+    """RequestTimings текущего запроса или None вне запроса."""
+    return _current.get()
+
+
+class ServerTimingMiddleware:
+    """Заголовок Server-Timing и строка лога с временем запроса.
+
+    db - SQL на всех соединениях, tpl - шаблоны без SQL внутри них
+    (нужен бэкенд core.template_backend.TimedDjangoTemplates),
+    app - остальное время Python, total - весь ответ. Строки лога
+    пишутся в логгер core.server_timing с уровнем INFO, значения
+    продублированы в extra['timings']. Включается SERVER_TIMING.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SERVER_TIMING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = RequestTimings()
+        token = _current.set(timings)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timings))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - started
+        template = timings.template - timings.template_db
+        metrics = {
+            'db': timings.db * 1000,
+            'tpl': template * 1000,
+            'app': max(total - timings.db - template, 0) * 1000,
+            'total': total * 1000,
+        }
+        response['Server-Timing'] = ', '.join(
+            f'{name};dur={value:.1f}' + (
+                f';desc="{timings.queries} SQL"' if name == 'db' else '')
+            for name, value in metrics.items()
+        )
+        match = request.resolver_match
+        view_name = match.view_name if match else None
+        logger.info(
+            'view=%s method=%s status=%s total_ms=%.1f db_ms=%.1f '
+            'db_queries=%d tpl_ms=%.1f app_ms=%.1f',
+            view_name, request.method, response.status_code,
+            metrics['total'], metrics['db'], timings.queries,
+            metrics['tpl'], metrics['app'],
+            extra={'timings': {
+                'view': view_name,
+                'method': request.method,
+                'status': response.status_code,
+                'db_queries': timings.queries,
+                **{f'{name}_ms': round(value, 3)
+                   for name, value in metrics.items()},
+            }},
+        )
+        return response
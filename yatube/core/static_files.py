@@ -0,0 +1,96 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+# Хешированное имя не меняет содержимого: кэшировать можно навсегда.
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Предпочтительный порядок кодировок: (токен Accept-Encoding, суффикс).
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+ACCEPT_ENCODING_RE = re.compile(r'\s*([\w*-]+)\s*(?:;\s*q=([\d.]+))?')
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding, кроме запрещенных через q=0."""
+    encodings = set()
+    for item in header.split(','):
+        match = ACCEPT_ENCODING_RE.match(item)
+        if match and match.group(2) not in ('0', '0.0', '0.00', '0.000'):
+            encodings.add(match.group(1).lower())
+    return encodings
+
+
+class StaticFilesMiddleware:
+    """Отдает собранную статику из STATIC_ROOT без обращения к
+    представлениям.
+
+    Хешированные имена из манифеста получают Cache-Control immutable
+    на год, остальные файлы - STATIC_CACHE_MAX_AGE секунд и проверку
+    по Last-Modified. Если браузер принимает br или gzip и рядом
+    лежит сжатый вариант от collectstatic, отдается он. Отключается,
+    если STATIC_ROOT не задан или статику отдает веб-сервер.
+    """
+
+    def __init__(self, get_response):
+        if not settings.STATIC_ROOT or not settings.STATIC_SERVE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL
+        self.immutable = set(getattr(staticfiles_storage, 'hashed_files',
+                                     {}).values())
+
+    def __call__(self, request):
+        if (request.method in ('GET', 'HEAD')
+                and request.path_info.startswith(self.prefix)):
+            response = self.serve(request,
+                                  request.path_info[len(self.prefix):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def serve(self, request, name):
+        try:
+            path = safe_join(settings.STATIC_ROOT, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            return None
+        stat = os.stat(path)
+        if not was_modified_since(
+                request.META.get('HTTP_IF_MODIFIED_SINCE'),
+                stat.st_mtime, stat.st_size):
+            response = HttpResponseNotModified()
+        else:
+            content_type = mimetypes.guess_type(path)[0]
+            accepted = accepted_encodings(
+                request.META.get('HTTP_ACCEPT_ENCODING', ''))
+            encoding = None
+            for token, suffix in ENCODINGS:
+                if token in accepted and os.path.isfile(path + suffix):
+                    path, encoding = path + suffix, token
+                    break
+            response = FileResponse(
+                open(path, 'rb'),
+                content_type=content_type or 'application/octet-stream',
+            )
+            # FileResponse подставляет имя сжатого файла.
+            del response['Content-Disposition']
+            if encoding:
+                response['Content-Encoding'] = encoding
+            response['Content-Length'] = os.path.getsize(path)
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if name in self.immutable:
+            response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        else:
+            response['Cache-Control'] = (
+                f'public, max-age={settings.STATIC_CACHE_MAX_AGE}')
+        return response
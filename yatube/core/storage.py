@@ -0,0 +1,79 @@
+import gzip
+import io
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Файлы, которые имеет смысл сжимать; картинки уже сжаты.
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.ico', '.json', '.txt',
+                           '.xml', '.html', '.map')
+# Меньшие файлы не сжимаются: выигрыш меньше заголовков.
+COMPRESS_MIN_SIZE = 256
+
+
+def gzip_compress(content):
+    # gzip.compress(mtime=...) появился только в Python 3.8; нулевое
+    # время делает архив воспроизводимым между запусками collectstatic.
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=9,
+                       mtime=0) as file:
+        file.write(content)
+    return buffer.getvalue()
+
+
+def compressors():
+    """Расширение варианта и функция сжатия: gzip и, если установлен
+    пакет brotli, br."""
+    yield '.gz', gzip_compress
+    if brotli is not None:
+        yield '.br', lambda content: brotli.compress(content,
+                                                     quality=11)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage, который при collectstatic пишет
+    рядом с хешированными файлами сжатые варианты .gz и .br.
+
+    Пока collectstatic не запускался и манифеста нет (разработка,
+    тесты), {% static %} возвращает исходные имена файлов.
+    """
+    manifest_strict = False
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if not dry_run:
+            # Сжимаем итоговые имена из манифеста, а не промежуточные
+            # проходы обработки CSS.
+            for hashed_name in sorted(set(self.hashed_files.values())):
+                self.compress(hashed_name)
+
+    def compress(self, name):
+        if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+            return False
+        with self.open(name) as file:
+            content = file.read()
+        if len(content) < COMPRESS_MIN_SIZE:
+            return False
+        compressed = False
+        for extension, compress in compressors():
+            variant = compress(content)
+            path = self.path(name) + extension
+            # Вариант, почти не меньший исходника, только мешает.
+            if len(variant) > len(content) * 0.95:
+                if os.path.exists(path):
+                    os.remove(path)
+                continue
+            with open(path, 'wb') as file:
+                file.write(variant)
+            compressed = True
+        return compressed
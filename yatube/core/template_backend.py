@@ -0,0 +1,27 @@
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+from .server_timing import current_timings
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        timings = current_timings()
+        if timings is None:
+            return super().render(context, request)
+        with timings.template_render():
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates, сообщающий время отрисовки в Server-Timing."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name),
+                                 self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
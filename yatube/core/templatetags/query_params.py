@@ -0,0 +1,13 @@
+from django import template
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def query_replace(context, **params):
+    """Строка запроса текущей страницы с замененными параметрами."""
+    query = context['request'].GET.copy()
+    for param in ('page', 'cursor'):
+        query.pop(param, None)
+    for param, value in params.items():
+        query[param] = value
+    return query.urlencode()
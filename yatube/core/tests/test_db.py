@@ -0,0 +1,50 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ..db import close_unusable_connections
+
+
+def pragma(wrapper, name):
+    with wrapper.cursor() as cursor:
+        cursor.execute(f'PRAGMA {name}')
+        return cursor.fetchone()[0]
+
+
+class SqlitePragmasTest(TestCase):
+    def test_pragmas_are_applied(self):
+        self.assertEqual(pragma(connection, 'synchronous'), 1)
+        self.assertEqual(pragma(connection, 'busy_timeout'), 20000)
+        self.assertEqual(pragma(connection, 'temp_store'), 2)
+
+
+class FileDatabaseTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.wrapper = DatabaseWrapper({
+            **connection.settings_dict,
+            'NAME': os.path.join(directory.name, 'db.sqlite3'),
+        }, alias='file')
+        self.addCleanup(self.wrapper.close)
+
+    def test_wal_journal(self):
+        self.assertEqual(pragma(self.wrapper, 'journal_mode'), 'wal')
+
+    def test_unusable_connection_is_closed(self):
+        self.wrapper.ensure_connection()
+        with mock.patch('core.db.connections.all',
+                        return_value=[self.wrapper]):
+            close_unusable_connections(sender=None)
+            self.assertIsNotNone(self.wrapper.connection)
+            with mock.patch.object(self.wrapper, 'is_usable',
+                                   return_value=False):
+                with override_settings(DATABASE_HEALTH_CHECKS=False):
+                    close_unusable_connections(sender=None)
+                self.assertIsNotNone(self.wrapper.connection)
+                close_unusable_connections(sender=None)
+        self.assertIsNone(self.wrapper.connection)
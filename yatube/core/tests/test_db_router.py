@@ -0,0 +1,43 @@
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from ..db_router import ReplicaRouter, read_alias, replica_reads
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def view(self, request):
+        return read_alias.get()
+
+    def test_reads_go_to_primary_outside_views(self):
+        self.assertEqual(self.router.db_for_read(None), 'default')
+        self.assertEqual(self.router.db_for_write(None), 'default')
+
+    def test_replica_reads_for_get(self):
+        view = replica_reads(self.view)
+        self.assertEqual(view(self.factory.get('/')), 'replica')
+        self.assertIsNone(view(self.factory.post('/')))
+        self.assertIsNone(read_alias.get())
+
+    def test_pinned_request_reads_primary(self):
+        request = self.factory.get('/')
+        request.COOKIES['db_primary'] = '1'
+        self.assertIsNone(replica_reads(self.view)(request))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        self.assertIsNone(replica_reads(self.view)(self.factory.get('/')))
+
+    def test_write_switches_reads_to_primary(self):
+        def view(request):
+            self.router.db_for_write(None)
+            return self.router.db_for_read(None)
+        self.assertEqual(replica_reads(view)(self.factory.get('/')),
+                         'default')
+
+    def test_migrations_skip_replicas(self):
+        self.assertTrue(self.router.allow_migrate('default', 'posts'))
+        self.assertFalse(self.router.allow_migrate('replica', 'posts'))
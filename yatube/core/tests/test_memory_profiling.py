@@ -0,0 +1,75 @@
+import tracemalloc
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from ..memory_profiling import VIEW_PEAKS, measure_memory
+
+User = get_user_model()
+
+
+class MeasureMemoryTest(TestCase):
+    def test_peak_and_top_sites(self):
+        with measure_memory() as report:
+            kept = [str(i) * 10 for i in range(10000)]
+            freed = [str(i) * 10 for i in range(20000)]
+            del freed
+        self.assertGreater(report.peak, report.retained)
+        self.assertGreater(report.retained, 100 * 1024)
+        self.assertIn('test_memory_profiling.py', report.top[0][0])
+        del kept
+
+    @mock.patch('core.memory_profiling.reset_peak', None)
+    def test_without_reset_peak(self):
+        # Python 3.7 и 3.8: трассировка уже идет, пик сбрасывается
+        # перезапуском.
+        tracemalloc.start()
+        self.addCleanup(tracemalloc.stop)
+        freed = [str(i) * 10 for i in range(20000)]
+        del freed
+        with measure_memory() as report:
+            kept = [str(i) * 10 for i in range(1000)]
+        self.assertTrue(tracemalloc.is_tracing())
+        self.assertGreater(report.retained, 10 * 1024)
+        self.assertLess(report.peak, 1024 * 1024)
+        del kept
+
+
+class MemoryProfilingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        Post.objects.create(author=cls.author, text='Пост')
+
+    @override_settings(MEMORY_PROFILING=True)
+    def test_middleware_records_view_peak(self):
+        url = reverse('posts:profile', kwargs={'username': 'auth'})
+        with self.assertLogs('core.memory_profiling', 'INFO') as logs:
+            response = self.client.get(url)
+        self.assertGreater(float(response['X-Memory-Peak']), 0)
+        self.assertIn('view=posts:profile', logs.output[0])
+        self.assertGreater(VIEW_PEAKS['posts:profile'], 0)
+
+    def test_disabled_by_default(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('X-Memory-Peak'))
+
+    def test_replay_command(self):
+        out = StringIO()
+        call_command('replay_memory', reverse('posts:index'),
+                     reverse('posts:post_create'), '--user', 'auth',
+                     '--top', '2', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith('/ 200 peak'))
+        self.assertIn('/create/ 200 peak', out.getvalue())
+
+    def test_replay_command_requires_urls(self):
+        with self.assertRaises(CommandError):
+            call_command('replay_memory', stdout=StringIO())
@@ -0,0 +1,60 @@
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..profiling import ProfileStore
+
+User = get_user_model()
+PROFILE_DIR = tempfile.mkdtemp()
+
+
+@override_settings(PROFILE_DIR=PROFILE_DIR, PROFILE_MAX_CAPTURES=2)
+class ProfilingTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(PROFILE_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        for capture_id in ProfileStore().ids():
+            ProfileStore().delete(capture_id)
+        self.staff = User.objects.create_user(username='staff',
+                                              is_staff=True)
+        self.client.force_login(self.staff)
+
+    def test_staff_capture_with_query_flag(self):
+        response = self.client.get(reverse('posts:index') + '?_profile')
+        capture_id = response['X-Profile-Id']
+        capture = ProfileStore().meta(capture_id)
+        self.assertEqual(capture['path'], '/?_profile')
+        self.assertEqual(capture['user'], 'staff')
+        detail = self.client.get(reverse('core:profile_detail',
+                                         args=[capture_id]))
+        self.assertContains(detail, 'cumulative')
+        self.assertContains(detail, 'index')
+        download = self.client.get(reverse('core:profile_download',
+                                           args=[capture_id]))
+        self.assertTrue(b''.join(download.streaming_content))
+
+    def test_header_flag_and_bounded_store(self):
+        for _ in range(3):
+            self.client.get(reverse('posts:index'), HTTP_X_PROFILE='1')
+        self.assertEqual(len(ProfileStore().ids()), 2)
+        response = self.client.get(reverse('core:profile_list'))
+        self.assertEqual(len(response.context['captures']), 2)
+
+    def test_non_staff_requests_are_not_profiled(self):
+        self.client.force_login(User.objects.create_user(username='user'))
+        response = self.client.get(reverse('posts:index') + '?_profile')
+        self.assertFalse(response.has_header('X-Profile-Id'))
+        self.assertEqual(ProfileStore().ids(), [])
+        response = self.client.get(reverse('core:profile_list'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_bad_capture_id(self):
+        response = self.client.get(reverse('core:profile_download',
+                                           args=['..%2Fsettings']))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,61 @@
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import TestCase, override_settings
+from django.urls import path
+
+from ..query_budget import (QueryBudgetExceeded, QueryBudgetTestMixin,
+                            count_queries, query_budget)
+
+User = get_user_model()
+
+
+def lookup_users(request):
+    for username in ('first', 'second', 'third'):
+        User.objects.filter(username=username).exists()
+    return HttpResponse()
+
+
+urlpatterns = [
+    path('within/', query_budget(3)(lookup_users)),
+    path('over/', query_budget(1)(lookup_users)),
+    path('unchecked/', lookup_users),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__, QUERY_BUDGET_MODE='raise')
+class QueryBudgetMiddlewareTest(TestCase):
+    def test_within_budget(self):
+        self.client.force_login(User.objects.create_user(username='auth'))
+        self.assertEqual(self.client.get('/within/').status_code, 200)
+
+    def test_over_budget_is_rejected(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded,
+                                      '3 SQL-запросов при бюджете 1'):
+            self.client.get('/over/')
+
+    @override_settings(QUERY_BUDGET_MODE='log')
+    def test_over_budget_is_logged_with_repeated_sql(self):
+        with self.assertLogs('core.query_budget', 'WARNING') as logs:
+            self.assertEqual(self.client.get('/over/').status_code, 200)
+        self.assertIn('3 x SELECT', logs.output[0])
+
+    @override_settings(QUERY_BUDGET_DEFAULT=1)
+    def test_default_budget(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get('/unchecked/')
+
+    def test_undecorated_views_are_not_checked(self):
+        self.assertEqual(self.client.get('/unchecked/').status_code, 200)
+
+
+class QueryBudgetTestMixinTest(QueryBudgetTestMixin, TestCase):
+    def test_failure_lists_repeated_queries(self):
+        with self.assertRaisesMessage(AssertionError, '3 x SELECT'):
+            with self.assertQueryBudget(2):
+                lookup_users(None)
+
+    def test_count_queries(self):
+        with count_queries() as counter:
+            lookup_users(None)
+        self.assertEqual(len(counter), 3)
+        self.assertEqual(len(counter.repeated()), 1)
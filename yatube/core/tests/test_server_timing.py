@@ -0,0 +1,52 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from ..server_timing import RequestTimings
+
+User = get_user_model()
+
+
+class ServerTimingMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        Post.objects.create(author=cls.author, text='Пост')
+
+    def test_header_and_log_line(self):
+        with self.assertLogs('core.server_timing', 'INFO') as logs:
+            response = self.client.get(
+                reverse('posts:profile', kwargs={'username': 'auth'}))
+        metrics = dict(re.findall(r'(\w+);dur=([\d.]+)',
+                                  response['Server-Timing']))
+        self.assertEqual(set(metrics), {'db', 'tpl', 'app', 'total'})
+        self.assertGreater(float(metrics['tpl']), 0)
+        self.assertRegex(response['Server-Timing'], r'desc="\d+ SQL"')
+        record = logs.records[0]
+        self.assertIn('view=posts:profile', record.getMessage())
+        self.assertEqual(record.timings['status'], 200)
+        self.assertGreater(record.timings['db_queries'], 0)
+
+    @override_settings(SERVER_TIMING=False)
+    def test_disabled(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+class RequestTimingsTest(TestCase):
+    def test_nested_templates_are_counted_once(self):
+        timings = RequestTimings()
+        with timings.template_render():
+            with timings.template_render():
+                pass
+        self.assertEqual(timings.template_depth, 0)
+        self.assertGreater(timings.template, 0)
+        outer = timings.template
+        with timings.template_render():
+            pass
+        self.assertGreater(timings.template, outer)
@@ -0,0 +1,89 @@
+import gzip
+import os
+import tempfile
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.templatetags.static import static
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..static_files import accepted_encodings
+from ..storage import brotli
+
+CSS = 'css/bootstrap.min.css'
+
+
+class CollectedStaticTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.override = override_settings(STATIC_ROOT=cls.directory.name)
+        cls.override.enable()
+        call_command('collectstatic', interactive=False, verbosity=0,
+                     ignore_patterns=['admin'])
+        cls.hashed_css = staticfiles_storage.stored_name(CSS)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.override.disable()
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_collectstatic_writes_compressed_variants(self):
+        self.assertNotEqual(self.hashed_css, CSS)
+        with open(self.path(self.hashed_css), 'rb') as file:
+            content = file.read()
+        with gzip.open(self.path(self.hashed_css + '.gz')) as file:
+            self.assertEqual(file.read(), content)
+        self.assertEqual(os.path.exists(self.path(self.hashed_css + '.br')),
+                         brotli is not None)
+        # Картинки не сжимаются.
+        logo = staticfiles_storage.stored_name('img/logo.png')
+        self.assertFalse(os.path.exists(self.path(logo + '.gz')))
+
+    def test_templates_link_hashed_files(self):
+        response = self.client.get(reverse('about:author'))
+        self.assertContains(response, static(CSS))
+        self.assertContains(response, static('img/fav/fav.ico'))
+        self.assertNotContains(response, 'href="img/fav/')
+
+    def test_hashed_file_is_immutable(self):
+        response = self.client.get(f'/static/{self.hashed_css}',
+                                   HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+        response = self.client.get(f'/static/{self.hashed_css}',
+                                   HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_unhashed_file_is_revalidated(self):
+        response = self.client.get(f'/static/{CSS}')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=60')
+        response = self.client.get(
+            f'/static/{CSS}',
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_missing_and_outside_files(self):
+        for url in ('/static/css/missing.css', '/static/../manage.py'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class StaticWithoutManifestTest(TestCase):
+    def test_static_falls_back_to_source_names(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(STATIC_ROOT=directory):
+                self.assertEqual(static(CSS), f'/static/{CSS}')
+
+    def test_accepted_encodings(self):
+        self.assertEqual(accepted_encodings('gzip;q=0, br;q=0.5, *'),
+                         {'br', '*'})
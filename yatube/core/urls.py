@@ -0,0 +1,12 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'core'
+
+urlpatterns = [
+    path('', views.profile_list, name='profile_list'),
+    path('<str:capture_id>/', views.profile_detail, name='profile_detail'),
+    path('<str:capture_id>/download/', views.profile_download,
+         name='profile_download'),
+]
@@ -1,7 +1,53 @@
+import os
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import FileResponse, Http404
 from django.shortcuts import render
 
+from .profiling import SORT_KEYS, ProfileStore
+
+
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@staff_member_required
+def profile_list(request):
+    return render(request, 'core/profiles.html', {
+        'title': 'Профили запросов',
+        'captures': ProfileStore().captures(),
+        'param': settings.PROFILE_PARAM,
+    })
+
+
+@staff_member_required
+def profile_detail(request, capture_id):
+    store = ProfileStore()
+    try:
+        capture = store.meta(capture_id)
+    except KeyError:
+        raise Http404
+    sort = request.GET.get('sort', SORT_KEYS[0])
+    return render(request, 'core/profile_detail.html', {
+        'title': f'Профиль {capture_id}',
+        'capture': capture,
+        'sort': sort,
+        'sort_keys': SORT_KEYS,
+        'report': store.top_functions(capture_id, sort),
+    })
+
+
+@staff_member_required
+def profile_download(request, capture_id):
+    try:
+        path = ProfileStore().path(capture_id)
+    except KeyError:
+        raise Http404
+    if not os.path.exists(path):
+        raise Http404
+    return FileResponse(open(path, 'rb'), as_attachment=True,
+                        filename=f'{capture_id}.prof')
@@ -1,14 +1,70 @@
+import hashlib
+
 from django.contrib import admin
-from .models import Post, Group
+from django.contrib.admin.widgets import ForeignKeyRawIdWidget
+from .cache import feed_count_key
+from .models import Follow, Post, Group
+from .search import filter_posts
+from .utils import FeedPaginator
+
+# Счетчики отфильтрованных списков не сбрасываются сигналами,
+# поэтому живут недолго.
+FILTERED_COUNT_TIMEOUT = 60
+
+
+class PostAdminPaginator(FeedPaginator):
+    """Пагинатор списка постов без COUNT(*) на каждый запрос.
+
+    Общее число постов берется из того же кэша, что и у главной ленты,
+    число отфильтрованных постов кэшируется по тексту запроса.
+    """
+
+    def __init__(self, queryset, per_page, orphans=0,
+                 allow_empty_first_page=True):
+        kwargs = {'orphans': orphans,
+                  'allow_empty_first_page': allow_empty_first_page}
+        if queryset.query.where:
+            digest = hashlib.md5(str(queryset.query).encode()).hexdigest()
+            kwargs.update(count_key=f'posts:admin-count:{digest}',
+                          count_timeout=FILTERED_COUNT_TIMEOUT)
+        else:
+            kwargs.update(count_key=feed_count_key('index'))
+        super().__init__(queryset, per_page, **kwargs)
+
+
+class ChangelistGroupWidget(ForeignKeyRawIdWidget):
+    """id группы в списке постов без запроса ее названия на каждую строку."""
+
+    def label_and_url_for_value(self, value):
+        return '', ''
 
 
 class PostAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'text', 'pub_date', 'author', 'group')
+    list_display = ('pk', 'text', 'pub_date', 'author', 'group',
+                    'group_title')
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
     list_editable = ('group',)
+    raw_id_fields = ('group',)
+    paginator = PostAdminPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
+    def group_title(self, obj):
+        return obj.group.title if obj.group else None
+    group_title.short_description = 'Название группы'
+
+    def get_changelist_form(self, request, **kwargs):
+        kwargs.setdefault('widgets', {'group': ChangelistGroupWidget(
+            Post._meta.get_field('group').remote_field, self.admin_site)})
+        return super().get_changelist_form(request, **kwargs)
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return filter_posts(queryset, search_term), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('pk', 'title', 'slug', 'description')
@@ -16,5 +72,14 @@ class GroupAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
+class FollowAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'user', 'author')
+    list_select_related = ('user', 'author')
+    raw_id_fields = ('user', 'author')
+    search_fields = ('user__username', 'author__username')
+    empty_value_display = '-пусто-'
+
+
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
+admin.site.register(Follow, FollowAdmin)
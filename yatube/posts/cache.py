@@ -0,0 +1,238 @@
+import hashlib
+import math
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import (DateTimeField, Exists, Func, IntegerField,
+                              OuterRef, Subquery)
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .models import Follow, Group, Post, PostsGeneration, User
+
+FEED_COUNT_KEY = 'posts:feed-count:{}'
+PAGE_KEY = 'posts:page:{}:{}'
+PAGE_STATS_KEY = 'posts:page-stats:{}:{}'
+# Имена представлений под кэшем страниц, для счетчиков попаданий.
+CACHED_PAGES = []
+
+
+def feed_count_key(scope, pk=None):
+    return FEED_COUNT_KEY.format(scope if pk is None else f'{scope}:{pk}')
+
+
+def invalidate_feed_counts(author_ids=(), group_ids=(), index=True):
+    keys = [feed_count_key('author', pk) for pk in author_ids]
+    keys += [feed_count_key('group', pk) for pk in group_ids]
+    if index:
+        keys.append(feed_count_key('index'))
+    cache.delete_many(keys)
+
+
+def post_card_key(post, updated_at=None):
+    """Ключ карточки поста: id и версия по времени последнего изменения."""
+    version = (updated_at or post.updated_at).timestamp()
+    return f'posts:card:{post.pk}:{version:.6f}'
+
+
+def latest_update(posts):
+    """Подзапрос: время последнего изменения постов (индекс по updated_at)."""
+    return Subquery(posts.order_by('-updated_at').values('updated_at')[:1],
+                    output_field=DateTimeField())
+
+
+def posts_count(posts):
+    """Подзапрос: число постов; меняется и при удалении."""
+    # COUNT(*), а не COUNT(id): так SQLite считает по самому узкому индексу.
+    return Subquery(posts.order_by().annotate(
+        total=Func(template='COUNT(*)', output_field=IntegerField())
+    ).values('total'), output_field=IntegerField())
+
+
+def index_freshness(request):
+    # Поколение сдвигают сигналы постов, включая удаление; MAX(updated_at)
+    # по индексу замечает и записи в обход сигналов.
+    return PostsGeneration.objects.filter(pk=PostsGeneration.PK).values_list(
+        'value', 'changed_at', latest_update(Post.objects.all())).first()
+
+
+def index_modified(values):
+    """Время изменения главной: changed_at растет при записи через
+    сигналы, MAX(updated_at) - при записи в обход них."""
+    return max(value for value in values[1:] if value is not None)
+
+
+def group_freshness(request, slug):
+    posts = Post.objects.filter(group=OuterRef('pk'))
+    return Group.objects.filter(slug=slug).values_list(
+        'title', 'description', latest_update(posts), posts_count(posts)
+    ).first()
+
+
+def author_freshness(request, username):
+    posts = Post.objects.filter(author=OuterRef('pk'))
+    return User.objects.filter(username=username).values_list(
+        'first_name', 'last_name', 'post_stats__posts_count',
+        latest_update(posts),
+    ).first()
+
+
+def profile_freshness(request, username):
+    """Как у ленты автора, плюс подписчики и подписка посетителя."""
+    fields = ['first_name', 'last_name', 'post_stats__posts_count',
+              'post_stats__followers_count',
+              latest_update(Post.objects.filter(author=OuterRef('pk')))]
+    if request.user.is_authenticated:
+        fields.append(Exists(Follow.objects.filter(
+            user=request.user, author=OuterRef('pk'))))
+    return User.objects.filter(username=username).values_list(
+        *fields).first()
+
+
+def post_freshness(request, post_id):
+    # Смена имени автора или группы сдвигает updated_at поста.
+    return Post.objects.filter(pk=post_id).values_list(
+        'updated_at', 'group__title', 'author__post_stats__posts_count',
+    ).first()
+
+
+def request_freshness(request, freshness, kwargs):
+    """Значение freshness для страницы; считается один раз на запрос."""
+    memo = request.__dict__.setdefault('_freshness', {})
+    if freshness not in memo:
+        memo[freshness] = freshness(request, **kwargs)
+    return memo[freshness]
+
+
+def count_page_cache(view_name, event):
+    key = PAGE_STATS_KEY.format(view_name, event)
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+def page_cache_stats():
+    keys = [PAGE_STATS_KEY.format(name, event)
+            for name in CACHED_PAGES for event in ('hits', 'misses')]
+    values = cache.get_many(keys)
+    return {
+        name: {event: values.get(PAGE_STATS_KEY.format(name, event), 0)
+               for event in ('hits', 'misses')}
+        for name in CACHED_PAGES
+    }
+
+
+def cache_fresh_view(view, freshness, timeout_setting, cacheable, location):
+    """Оборачивает view кэшем ответов, ключ которого включает freshness.
+
+    Значение freshness читается из базы на каждый запрос, поэтому после
+    записи ключ меняется во всех процессах и никакой общей инвалидации
+    не нужно; срок хранения только ограничивает память под старые
+    ключи. cacheable(request) решает, можно ли кэшировать запрос,
+    location(request) - какая часть адреса входит в ключ.
+    """
+    view_name = getattr(view, '__name__', type(view).__name__)
+    CACHED_PAGES.append(view_name)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        timeout = getattr(settings, timeout_setting)
+        if (not timeout or request.method not in ('GET', 'HEAD')
+                or not cacheable(request)):
+            return view(request, *args, **kwargs)
+        values = request_freshness(request, freshness, kwargs)
+        if values is None:
+            return view(request, *args, **kwargs)
+        key = PAGE_KEY.format(view_name, hashlib.md5('|'.join([
+            location(request), *map(str, values),
+        ]).encode()).hexdigest())
+        response = cache.get(key)
+        if response is not None:
+            count_page_cache(view_name, 'hits')
+            return response
+        count_page_cache(view_name, 'misses')
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200 and not response.cookies:
+            cache.set(key, response, timeout)
+        return response
+    return wrapper
+
+
+def cache_anonymous_page(freshness):
+    """Кэширует страницу для анонимных GET-запросов.
+
+    freshness - та же функция, что у conditional_page. Включается
+    настройкой POSTS_PAGE_CACHE_TIMEOUT.
+    """
+    def decorator(view):
+        return cache_fresh_view(
+            view, freshness, 'POSTS_PAGE_CACHE_TIMEOUT',
+            lambda request: not request.user.is_authenticated,
+            lambda request: request.get_full_path(),
+        )
+    return decorator
+
+
+def cache_feed(freshness):
+    """Кэширует тело RSS/Atom-ленты для всех посетителей.
+
+    Лента не зависит от пользователя, но содержит абсолютные ссылки,
+    поэтому в ключ входит и хост. Срок - POSTS_FEED_CACHE_TIMEOUT.
+    """
+    def decorator(view):
+        return cache_fresh_view(
+            view, freshness, 'POSTS_FEED_CACHE_TIMEOUT',
+            lambda request: True,
+            lambda request: request.build_absolute_uri(),
+        )
+    return decorator
+
+
+def conditional_page(freshness, last_modified=None):
+    """Отвечает 304 Not Modified, если страница не менялась.
+
+    freshness(request, **kwargs) одним запросом к базе возвращает
+    значения, от которых зависит страница: время последнего изменения
+    постов области, их число, поля автора или группы. ETag строится из
+    них, адреса, пользователя и его CSRF-секрета: после повторного входа
+    страница с формой подписки не должна остаться с прежним токеном.
+    Проверка идет до основных запросов и отрисовки шаблона и одинакова
+    во всех процессах, потому что читает базу, а не кэш.
+
+    last_modified(values) задается только там, где время изменения не
+    уменьшается: MAX(updated_at) ленты откатывается назад при удалении
+    поста, и такие страницы отдают только ETag.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            values = request_freshness(request, freshness, kwargs)
+            if values is None:
+                return view(request, *args, **kwargs)
+            user = request.user
+            etag = quote_etag(hashlib.md5('|'.join([
+                request.get_full_path(),
+                user.get_username(),
+                request.META.get('CSRF_COOKIE', '')
+                if user.is_authenticated else '',
+                *map(str, values),
+            ]).encode()).hexdigest())
+            modified = (math.ceil(last_modified(values).timestamp())
+                        if last_modified else None)
+            response = get_conditional_response(
+                request, etag=etag, last_modified=modified)
+            if response is not None:
+                return response
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200:
+                response['ETag'] = etag
+                if modified:
+                    response['Last-Modified'] = http_date(modified)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,54 @@
+import csv
+import json
+
+from django.db.models import QuerySet
+
+FORMATS = ('jsonl', 'csv')
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+EXPORT_FIELDS = ('text', 'author', 'group', 'pub_date')
+CHUNK_SIZE = 2000
+
+
+class Echo:
+    """Псевдофайл для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset: QuerySet, chunk_size: int = CHUNK_SIZE):
+    """Посты словарями с полями EXPORT_FIELDS, читаемые по chunk_size.
+
+    iterator() не кэширует queryset, поэтому в памяти одновременно
+    находится не больше одной пачки строк.
+    """
+    rows = queryset.order_by('pub_date', 'pk').values_list(
+        'text', 'author__username', 'group__slug', 'pub_date'
+    ).iterator(chunk_size=chunk_size)
+    for text, author, group, pub_date in rows:
+        yield {
+            'text': text,
+            'author': author,
+            'group': group or '',
+            'pub_date': pub_date.isoformat(),
+        }
+
+
+def export_lines(queryset: QuerySet, data_format: str,
+                 chunk_size: int = CHUNK_SIZE):
+    """Строки JSONL или CSV (с заголовком), готовые к записи в поток.
+
+    Формат совпадает с тем, что принимает команда import_posts.
+    """
+    rows = export_rows(queryset, chunk_size)
+    if data_format == 'csv':
+        writer = csv.DictWriter(Echo(), EXPORT_FIELDS)
+        yield writer.writeheader()
+        for row in rows:
+            yield writer.writerow(row)
+        return
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
@@ -0,0 +1,108 @@
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+
+from .cache import (author_freshness, cache_feed, conditional_page,
+                    group_freshness, index_freshness, index_modified)
+from .models import Group, Post, User
+
+TEXT_SHORT = 30
+
+
+class PostsFeed(Feed):
+    """RSS-лента последних постов сайта."""
+    title = 'Yatube: последние обновления'
+    description = 'Новые записи на сайте'
+
+    def link(self):
+        return reverse('posts:index')
+
+    def items(self):
+        return Post.objects.feed()[:settings.POSTS_FEED_SIZE]
+
+    def item_title(self, item):
+        return item.text[:TEXT_SHORT]
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', kwargs={'post_id': item.pk})
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_updateddate(self, item):
+        return item.updated_at
+
+
+class GroupPostsFeed(PostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, group):
+        return f'Yatube: записи сообщества {group.title}'
+
+    def description(self, group):
+        return group.description
+
+    def link(self, group):
+        return reverse('posts:group_posts', kwargs={'slug': group.slug})
+
+    def items(self, group):
+        return group.posts.feed()[:settings.POSTS_FEED_SIZE]
+
+
+class AuthorPostsFeed(PostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, author):
+        return f'Yatube: посты {author.get_full_name() or author.username}'
+
+    def description(self, author):
+        return f'Новые записи пользователя {author.username}'
+
+    def link(self, author):
+        return reverse('posts:profile', kwargs={'username': author.username})
+
+    def items(self, author):
+        return author.posts.feed()[:settings.POSTS_FEED_SIZE]
+
+
+class AtomFeedMixin:
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self._get_dynamic_attr('description', obj)
+
+
+class PostsAtomFeed(AtomFeedMixin, PostsFeed):
+    pass
+
+
+class GroupPostsAtomFeed(AtomFeedMixin, GroupPostsFeed):
+    pass
+
+
+class AuthorPostsAtomFeed(AtomFeedMixin, AuthorPostsFeed):
+    pass
+
+
+def feed_view(feed, freshness, last_modified=None):
+    """Лента с кэшированным телом и ответами 304 по freshness."""
+    return conditional_page(freshness, last_modified)(
+        cache_feed(freshness)(feed))
+
+
+index_rss = feed_view(PostsFeed(), index_freshness, index_modified)
+index_atom = feed_view(PostsAtomFeed(), index_freshness, index_modified)
+group_rss = feed_view(GroupPostsFeed(), group_freshness)
+group_atom = feed_view(GroupPostsAtomFeed(), group_freshness)
+author_rss = feed_view(AuthorPostsFeed(), author_freshness)
+author_atom = feed_view(AuthorPostsAtomFeed(), author_freshness)
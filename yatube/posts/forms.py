@@ -5,7 +5,9 @@ from .models import Post
 class PostForm(ModelForm):
     class Meta:
         model = Post
-        labels = {'group': 'Группа', 'text': 'Текст поста'}
+        labels = {'group': 'Группа', 'text': 'Текст поста',
+                  'image': 'Картинка'}
         help_texts = {'group': 'Группа, к которой будет относиться пост',
-                      'text': 'Текст нового поста'}
-        fields = ['text', 'group']
+                      'text': 'Текст нового поста',
+                      'image': 'Картинка к посту, необязательно'}
+        fields = ['text', 'group', 'image']
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import CHUNK_SIZE, FORMATS, export_lines
+from posts.models import Group, Post, User
+
+
+class Command(BaseCommand):
+    help = ('Потоково выгружает посты автора, группы или всей ленты '
+            'в JSONL или CSV в формате команды import_posts')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--author', help='username автора')
+        parser.add_argument('--group', help='slug группы')
+        parser.add_argument('--format', choices=FORMATS, default='jsonl')
+        parser.add_argument('--output', help='файл, по умолчанию stdout')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        posts = Post.objects.all()
+        if options['author']:
+            if not User.objects.filter(username=options['author']).exists():
+                raise CommandError(f'Нет автора {options["author"]}')
+            posts = posts.filter(author__username=options['author'])
+        if options['group']:
+            if not Group.objects.filter(slug=options['group']).exists():
+                raise CommandError(f'Нет группы {options["group"]}')
+            posts = posts.filter(group__slug=options['group'])
+        lines = export_lines(posts, options['format'], options['chunk_size'])
+        if not options['output']:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        exported = 0
+        with open(options['output'], 'w', newline='',
+                  encoding='utf-8') as file:
+            for line in lines:
+                file.write(line)
+                exported += 1
+        if options['format'] == 'csv':
+            exported -= 1
+        self.stderr.write(self.style.SUCCESS(
+            f'Выгружено постов: {exported}'))
@@ -0,0 +1,175 @@
+import csv
+import json
+import sys
+import time
+from collections import Counter
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from pytils.translit import slugify
+
+from posts.models import Group, Post, User, preserve_pub_date
+from posts.signals import posts_bulk_created
+
+FORMATS = ('jsonl', 'csv')
+# Сколько авторов и групп держать в памяти между пачками.
+LOOKUP_CACHE_SIZE = 100000
+# Значений в одном IN: SQLite до 3.32 принимает не больше 999 параметров.
+LOOKUP_CHUNK_SIZE = 500
+
+
+def chunks(values, size=LOOKUP_CHUNK_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+class Command(BaseCommand):
+    help = ('Потоково импортирует посты из JSONL или CSV с полями '
+            'text, author (username), group (slug или название) '
+            'и pub_date (ISO 8601)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='файл или - для stdin')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--create-authors', action='store_true',
+                            help='создавать отсутствующих пользователей')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        data_format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl')
+        self.create_authors = options['create_authors']
+        self.authors = {}
+        self.groups = {}
+        self.skipped = 0
+        imported = 0
+        started = time.monotonic()
+        stream = (sys.stdin if path == '-'
+                  else open(path, newline='', encoding='utf-8'))
+        try:
+            rows = self.read(stream, data_format)
+            while True:
+                batch = list(islice(rows, options['batch_size']))
+                if not batch:
+                    break
+                imported += self.import_batch(batch)
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'{imported} постов, {imported / elapsed:.0f} в секунду'
+                )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано постов: {imported}, пропущено: {self.skipped}, '
+            f'{elapsed:.1f} с ({imported / max(elapsed, 1e-9):.0f} в секунду)'
+        ))
+
+    def read(self, stream, data_format):
+        if data_format == 'csv':
+            yield from csv.DictReader(stream)
+            return
+        for number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as error:
+                raise CommandError(f'Строка {number}: {error}')
+            if not isinstance(row, dict):
+                raise CommandError(f'Строка {number}: ожидался объект')
+            yield row
+
+    def skip(self, row, reason):
+        self.skipped += 1
+        self.stderr.write(f'Пропущен пост {row!r}: {reason}')
+
+    def resolve_authors(self, usernames):
+        missing = set(usernames) - self.authors.keys()
+        if len(self.authors) > LOOKUP_CACHE_SIZE:
+            self.authors.clear()
+            missing = set(usernames)
+        if not missing:
+            return
+        self.authors.update(self.find_authors(missing))
+        created = missing - self.authors.keys()
+        if self.create_authors and created:
+            User.objects.bulk_create(
+                User(username=username, password=make_password(None))
+                for username in created
+            )
+            self.authors.update(self.find_authors(created))
+
+    def find_authors(self, usernames):
+        found = {}
+        for chunk in chunks(usernames):
+            found.update(User.objects.filter(username__in=chunk)
+                         .values_list('username', 'id'))
+        return found
+
+    def resolve_groups(self, names):
+        missing = set(names) - self.groups.keys()
+        if len(self.groups) > LOOKUP_CACHE_SIZE:
+            self.groups.clear()
+            missing = set(names)
+        if not missing:
+            return
+        # Новая группа получит slug из названия: ищем и по нему, иначе
+        # "Cats" при существующей группе "cats" нарушил бы уникальность.
+        slugs = {name: slugify(name)[:100] for name in missing}
+        by_slug = {}
+        for chunk in chunks(missing | set(slugs.values())):
+            for pk, slug, title in Group.objects.filter(
+                    Q(slug__in=chunk) | Q(title__in=chunk)
+            ).values_list('id', 'slug', 'title'):
+                self.groups[slug] = self.groups[title] = by_slug[slug] = pk
+        for name in missing - self.groups.keys():
+            if slugs[name] not in by_slug:
+                group = Group(title=name, description='')
+                group.save()
+                by_slug[group.slug] = group.pk
+            self.groups[name] = by_slug[slugs[name]]
+
+    def build_post(self, row):
+        text = (row.get('text') or '').strip()
+        author_id = self.authors.get(row.get('author'))
+        if not text or author_id is None:
+            self.skip(row, 'нет текста или автора')
+            return None
+        pub_date = timezone.now()
+        if row.get('pub_date'):
+            try:
+                pub_date = parse_datetime(row['pub_date'])
+            except ValueError:
+                pub_date = None
+            if pub_date is None:
+                self.skip(row, 'неверная дата')
+                return None
+            if timezone.is_naive(pub_date):
+                pub_date = timezone.make_aware(pub_date, timezone.utc)
+        return Post(text=text, author_id=author_id, pub_date=pub_date,
+                    group_id=self.groups.get(row.get('group') or None))
+
+    def import_batch(self, rows):
+        self.resolve_authors(row['author'] for row in rows
+                             if row.get('author'))
+        self.resolve_groups(row['group'] for row in rows if row.get('group'))
+        posts = [post for post in map(self.build_post, rows) if post]
+        with transaction.atomic(), preserve_pub_date():
+            after_id = Post.objects.aggregate(last=Max('id'))['last'] or 0
+            Post.objects.bulk_create(posts)
+            posts_bulk_created.send(
+                sender=Post,
+                after_id=after_id,
+                author_counts=Counter(post.author_id for post in posts),
+                group_ids={post.group_id for post in posts} - {None},
+            )
+        return len(posts)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import AuthorStats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики постов авторов'
+
+    def handle(self, *args, **options):
+        authors = AuthorStats.objects.rebuild()
+        self.stdout.write(f'Пересчитаны счетчики постов: {authors} авторов')
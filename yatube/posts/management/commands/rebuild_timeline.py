@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts.timeline import rebuild
+
+
+class Command(BaseCommand):
+    help = ('Перестраивает ленты подписок по текущему '
+            'TIMELINE_FANOUT_MAX_FOLLOWERS')
+
+    def handle(self, *args, **options):
+        removed, entries = rebuild()
+        self.stdout.write(f'Удалено строк лент: {removed}, '
+                          f'всего строк: {entries}')
@@ -0,0 +1,156 @@
+import random
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils.dateparse import parse_date
+
+from posts.models import Group, Post, User
+from posts.signals import posts_bulk_created
+
+WORDS = (
+    'погода', 'город', 'утро', 'вечер', 'книга', 'кофе', 'море', 'лес',
+    'работа', 'отпуск', 'поезд', 'кино', 'музыка', 'друг', 'дом', 'сад',
+    'снег', 'дождь', 'солнце', 'ветер', 'река', 'мост', 'улица', 'парк',
+    'новость', 'история', 'вопрос', 'ответ', 'идея', 'план', 'день', 'год',
+)
+
+# Размер кэша страниц SQLite на время заполнения, KiB.
+SQLITE_CACHE_KIB = 512 * 1024
+
+
+def insert_sql(model, fields):
+    """INSERT для executemany с именами таблицы и колонок из модели."""
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(model._meta.get_field(field).column)
+                        for field in fields)
+    placeholders = ', '.join(['%s'] * len(fields))
+    return (f'INSERT INTO {quote(model._meta.db_table)} ({columns}) '
+            f'VALUES ({placeholders})')
+
+
+class Command(BaseCommand):
+    help = ('Быстро и воспроизводимо заполняет базу пользователями, '
+            'группами и постами для нагрузочных замеров')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--skew', type=float, default=1.0,
+                            help='показатель степенного закона постов '
+                                 'по авторам; 0 - равномерно')
+        parser.add_argument('--group-share', type=float, default=0.7,
+                            help='доля постов с группой')
+        parser.add_argument('--days', type=int, default=5 * 365,
+                            help='за сколько дней распределить pub_date')
+        parser.add_argument('--until', default='2025-01-01',
+                            help='дата самого позднего поста')
+        parser.add_argument('--prefix', default='seed',
+                            help='префикс имен пользователей и групп')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=50000)
+
+    def handle(self, *args, **options):
+        until = parse_date(options['until'])
+        if until is None:
+            raise CommandError('--until: нужна дата ГГГГ-ММ-ДД')
+        prefix = options['prefix']
+        if (User.objects.filter(username__startswith=f'{prefix}_user')
+                .exists()):
+            raise CommandError(f'Данные с префиксом {prefix} уже есть, '
+                               'выберите другой --prefix')
+        rnd = random.Random(options['seed'])
+        started = time.monotonic()
+        if connection.vendor == 'sqlite':
+            # Три индекса постов обновляются вразнобой: без большого
+            # кэша страниц SQLite большую часть времени ждет диск.
+            with connection.cursor() as cursor:
+                cursor.execute(f'PRAGMA cache_size = -{SQLITE_CACHE_KIB}')
+        with transaction.atomic():
+            author_ids = self.create_users(prefix, options['users'])
+            group_ids = self.create_groups(prefix, options['groups'])
+            after_id = Post.objects.aggregate(last=Max('id'))['last'] or 0
+            author_counts = self.create_posts(
+                rnd, options, author_ids, group_ids,
+                datetime.combine(until, datetime.min.time()),
+            )
+            self.stdout.write(f'Посты вставлены за '
+                              f'{time.monotonic() - started:.1f} с')
+            posts_bulk_created.send(
+                sender=Post,
+                after_id=after_id,
+                author_counts=author_counts,
+                group_ids=group_ids,
+            )
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(author_ids)}, групп: '
+            f'{len(group_ids)}, постов: {options["posts"]} за {elapsed:.1f} с'
+        ))
+
+    def create_users(self, prefix, count):
+        password = make_password(None)
+        joined = connection.ops.adapt_datetimefield_value(
+            datetime(2000, 1, 1))
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                insert_sql(User, ('username', 'password', 'first_name',
+                                  'last_name', 'email', 'is_superuser',
+                                  'is_staff', 'is_active', 'date_joined')),
+                [(f'{prefix}_user{i}', password, 'Имя', f'Фамилия {i}', '',
+                  False, False, True, joined)
+                 for i in range(1, count + 1)]
+            )
+        # Порядок по номеру: первый автор - самый активный.
+        ids = dict(User.objects.filter(username__startswith=f'{prefix}_user')
+                   .values_list('username', 'id'))
+        return [ids[f'{prefix}_user{i}'] for i in range(1, count + 1)]
+
+    def create_groups(self, prefix, count):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                insert_sql(Group, ('title', 'slug', 'description')),
+                [(f'Группа {prefix} {i}', f'{prefix}-group-{i}',
+                  f'Описание группы {i}') for i in range(1, count + 1)]
+            )
+        return list(Group.objects.filter(slug__startswith=f'{prefix}-group-')
+                    .order_by('id').values_list('id', flat=True))
+
+    def create_posts(self, rnd, options, author_ids, group_ids, until):
+        """Вставляет посты пачками напрямую, минуя auto_now_add."""
+        skew = options['skew']
+        author_weights = list(accumulate(
+            1 / rank ** skew for rank in range(1, len(author_ids) + 1)))
+        span = options['days'] * 24 * 60 * 60
+        adapt = connection.ops.adapt_datetimefield_value
+        group_share = options['group_share']
+        sql = insert_sql(Post, ('text', 'pub_date', 'updated_at', 'author',
+                                'group', 'image'))
+        author_counts = Counter()
+        created = 0
+        while created < options['posts']:
+            size = min(options['batch_size'], options['posts'] - created)
+            authors = rnd.choices(author_ids, cum_weights=author_weights,
+                                  k=size)
+            rows = []
+            for author_id in authors:
+                pub_date = adapt(until - timedelta(seconds=rnd.random()
+                                                   * span))
+                group_id = (rnd.choice(group_ids)
+                            if group_ids and rnd.random() < group_share
+                            else None)
+                text = ' '.join(rnd.choices(WORDS, k=rnd.randint(3, 30)))
+                rows.append((text.capitalize(), pub_date, pub_date,
+                             author_id, group_id, ''))
+            with connection.cursor() as cursor:
+                cursor.executemany(sql, rows)
+            author_counts.update(authors)
+            created += size
+            self.stdout.write(f'{created} постов')
+        return author_counts
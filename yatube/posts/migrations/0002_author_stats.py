@@ -0,0 +1,37 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:17
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def fill_author_stats(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    counts = (Post.objects.order_by().values_list('author_id')
+              .annotate(total=Count('id')))
+    AuthorStats.objects.bulk_create(
+        AuthorStats(author_id=author_id, posts_count=total)
+        for author_id, total in counts
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posts_count', models.PositiveIntegerField(default=0)),
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='post_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(fill_author_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations
+
+CREATE_FTS = """
+CREATE VIRTUAL TABLE posts_post_fts USING fts5(
+    text, tokenize = 'unicode61 remove_diacritics 2'
+);
+INSERT INTO posts_post_fts (rowid, text) SELECT id, text FROM posts_post;
+"""
+
+DROP_FTS = 'DROP TABLE posts_post_fts;'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0003_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_FTS, DROP_FTS),
+    ]
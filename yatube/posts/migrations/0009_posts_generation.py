@@ -0,0 +1,28 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:37
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def create_generation(apps, schema_editor):
+    PostsGeneration = apps.get_model('posts', 'PostsGeneration')
+    PostsGeneration.objects.create(pk=1, changed_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_updated_at_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostsGeneration',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+                ('changed_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.RunPython(create_generation, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,14 @@
+from collections import defaultdict
+from contextlib import contextmanager
+
 from pytils.translit import slugify
-from django.db import models
+from sorl.thumbnail import ImageField
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.utils import timezone
 
 
 User = get_user_model()
@@ -24,9 +31,34 @@ class Group(models.Model):
         super().save(*args, **kwargs)
 
 
+class PostQuerySet(models.QuerySet):
+    FEED_FIELDS = (
+        'text',
+        'pub_date',
+        'updated_at',
+        'author__username',
+        'author__first_name',
+        'author__last_name',
+        'group__slug',
+        'image',
+    )
+
+    def feed(self):
+        """Посты для карточек ленты: автор и группа одним JOIN."""
+        return self.select_related('author', 'group').only(*self.FEED_FIELDS)
+
+    def touch(self):
+        """Сдвигает updated_at, чтобы сбросить кэш карточек постов."""
+        updated = self.update(updated_at=timezone.now())
+        if updated:
+            PostsGeneration.objects.bump()
+        return updated
+
+
 class Post(models.Model):
     text = models.TextField()
     pub_date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -38,14 +70,236 @@ class Post(models.Model):
                               on_delete=models.SET_NULL,
                               related_name='posts'
                               )
+    image = ImageField(
+        'Картинка',
+        upload_to='posts/',
+        blank=True
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['pub_date', 'id'],
+                         name='post_pub_date_id_idx'),
+            models.Index(fields=['group', 'pub_date'],
+                         name='post_group_pub_date_idx'),
+            models.Index(fields=['author', 'pub_date'],
+                         name='post_author_pub_date_idx'),
+            # Время последнего изменения для условных GET-запросов.
+            models.Index(fields=['updated_at'],
+                         name='post_updated_at_idx'),
+            models.Index(fields=['group', 'updated_at'],
+                         name='post_group_updated_at_idx'),
+            models.Index(fields=['author', 'updated_at'],
+                         name='post_author_updated_at_idx'),
+        ]
 
     def __str__(self):
         return self.text
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Значения из базы нужны сигналам, чтобы заметить смену автора.
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     def save(self, *args, **kwargs):
         if not self:
             self = slugify(self.text)[:15]
         super().save(*args, **kwargs)
+
+
+@contextmanager
+def preserve_pub_date():
+    """Сохраняет pub_date, заданный вручную (импорт, генерация данных).
+
+    Поле auto_now_add иначе перезаписывает дату при bulk_create.
+    Меняет определение поля на время блока, поэтому предназначено
+    только для management-команд.
+    """
+    field = Post._meta.get_field('pub_date')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class AuthorStatsQuerySet(models.QuerySet):
+    def change_posts_count(self, author_id, delta):
+        updated = self.filter(author_id=author_id).update(
+            posts_count=F('posts_count') + delta
+        )
+        if not updated and delta > 0:
+            self.create_counts(author_id)
+
+    def change_followers_count(self, author_id, delta):
+        updated = self.filter(author_id=author_id).update(
+            followers_count=F('followers_count') + delta
+        )
+        if not updated and delta > 0:
+            self.create_counts(author_id)
+
+    def create_counts(self, author_id):
+        """Счетчиков еще нет: считаем посты и подписчиков один раз."""
+        self.get_or_create(author_id=author_id, defaults={
+            'posts_count': Post.objects.filter(author_id=author_id).count(),
+            'followers_count': Follow.objects.filter(
+                author_id=author_id).count(),
+        })
+
+    def add_posts_counts(self, author_counts, chunk_size=500):
+        """change_posts_count для многих авторов после массовой вставки.
+
+        Авторы с одинаковым приростом обновляются одним UPDATE, счетчики
+        новых авторов считаются одним GROUP BY.
+        """
+        ids = list(author_counts)
+        existing = set()
+        for start in range(0, len(ids), chunk_size):
+            existing.update(self.filter(
+                author_id__in=ids[start:start + chunk_size]
+            ).values_list('author_id', flat=True))
+        by_delta = defaultdict(list)
+        for author_id in existing:
+            by_delta[author_counts[author_id]].append(author_id)
+        for delta, author_ids in by_delta.items():
+            for start in range(0, len(author_ids), chunk_size):
+                self.filter(
+                    author_id__in=author_ids[start:start + chunk_size]
+                ).update(posts_count=F('posts_count') + delta)
+        missing = [author_id for author_id in ids if author_id not in existing]
+        for start in range(0, len(missing), chunk_size):
+            counts = (Post.objects.filter(
+                author_id__in=missing[start:start + chunk_size]
+            ).order_by().values_list('author_id').annotate(total=Count('id')))
+            self.bulk_create(
+                AuthorStats(author_id=author_id, posts_count=total)
+                for author_id, total in counts
+            )
+
+    def rebuild(self, batch_size=None):
+        counts = (Post.objects.order_by().values_list('author_id')
+                  .annotate(total=Count('id')))
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(
+                (AuthorStats(author_id=author_id, posts_count=total)
+                 for author_id, total in counts.iterator()),
+                batch_size=batch_size,
+            )
+            # Подписчики нужны только авторам с постами: остальным
+            # счетчик создается вместе с первым постом.
+            self.update(followers_count=Coalesce(Subquery(
+                Follow.objects.filter(author_id=OuterRef('author_id'))
+                .order_by().values('author_id')
+                .annotate(total=Count('id')).values('total')
+            ), 0))
+        return self.count()
+
+
+class AuthorStats(models.Model):
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='post_stats'
+    )
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+
+    objects = AuthorStatsQuerySet.as_manager()
+
+    def __str__(self):
+        return f'{self.author_id}: {self.posts_count}'
+
+
+class Follow(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follower'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='following'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'author'],
+                                    name='follow_user_author_unique'),
+            models.CheckConstraint(check=~models.Q(user=F('author')),
+                                   name='follow_not_self'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} -> {self.author_id}'
+
+
+class TimelineEntry(models.Model):
+    """Пост в ленте подписок пользователя, записанный при публикации.
+
+    pub_date копирует дату поста, чтобы лента читалась по индексу
+    (user, pub_date) без обхода всех постов авторов.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='timeline_user_post_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'pub_date', 'post'],
+                         name='timeline_user_pub_date_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id}: {self.post_id}'
+
+
+class PostsGenerationQuerySet(models.QuerySet):
+    def bump(self):
+        updated = self.filter(pk=PostsGeneration.PK).update(
+            value=F('value') + 1, changed_at=timezone.now())
+        if not updated:
+            self.get_or_create(pk=PostsGeneration.PK,
+                               defaults={'changed_at': timezone.now()})
+
+
+class PostsGeneration(models.Model):
+    """Поколение постов: одна строка, которая сдвигается при каждом
+    создании, изменении и удалении поста.
+
+    По ней главная страница узнает о любой записи, не пересчитывая
+    посты; changed_at только растет, в отличие от MAX(updated_at),
+    который уменьшается при удалении последнего поста.
+    """
+    PK = 1
+
+    value = models.BigIntegerField(default=0)
+    changed_at = models.DateTimeField()
+
+    objects = PostsGenerationQuerySet.as_manager()
+
+    def __str__(self):
+        return f'{self.value}: {self.changed_at}'
+
+
+def get_posts_count(author):
+    stats = getattr(author, 'post_stats', None)
+    return stats.posts_count if stats else 0
@@ -0,0 +1,102 @@
+"""Полнотекстовый поиск по постам через виртуальную таблицу SQLite FTS5.
+
+Таблица posts_post_fts хранит копию текста поста с rowid, равным id
+поста, и обновляется сигналами при сохранении и удалении постов.
+"""
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+WORD = re.compile(r'\w+')
+
+
+def match_expression(query):
+    """Переводит пользовательский запрос в безопасное выражение MATCH.
+
+    Каждое слово становится префиксным термином в кавычках, поэтому
+    операторы FTS5 в запросе не интерпретируются.
+    """
+    words = WORD.findall(query or '')
+    return ' '.join(f'"{word}"*' for word in words) or None
+
+
+def index_post(post):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                       [post.pk])
+        cursor.execute(f'INSERT INTO {FTS_TABLE} (rowid, text) '
+                       'VALUES (%s, %s)', [post.pk, post.text])
+
+
+def index_posts_after(pk):
+    """Индексирует посты с id больше pk, добавленные через bulk_create."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {FTS_TABLE} (rowid, text) '
+                       'SELECT id, text FROM posts_post WHERE id > %s', [pk])
+
+
+def unindex_post(pk):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [pk])
+
+
+def rebuild_index():
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(f'INSERT INTO {FTS_TABLE} (rowid, text) '
+                       'SELECT id, text FROM posts_post')
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) "
+                       "VALUES ('optimize')")
+        cursor.execute(f'SELECT count(*) FROM {FTS_TABLE}')
+        return cursor.fetchone()[0]
+
+
+def filter_posts(queryset, query):
+    """Ограничивает queryset постами, подходящими под запрос (без ранга)."""
+    expression = match_expression(query)
+    if expression is None:
+        return queryset.none()
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        (expression,)
+    ))
+
+
+class SearchResults:
+    """Результаты поиска по рангу bm25 с интерфейсом для Paginator."""
+
+    def __init__(self, query):
+        self.expression = match_expression(query)
+
+    def count(self):
+        if self.expression is None:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s', [self.expression]
+            )
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError('SearchResults supports only slicing')
+        if self.expression is None:
+            return []
+        start = index.start or 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                'ORDER BY rank LIMIT %s OFFSET %s',
+                [self.expression, index.stop - start, start]
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        posts = Post.objects.feed().in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
@@ -0,0 +1,194 @@
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import Signal, receiver
+
+from .cache import invalidate_feed_counts, post_card_key
+from .models import (AuthorStats, Follow, Group, Post, PostsGeneration,
+                     TimelineEntry, User)
+from .search import index_post, index_posts_after, unindex_post
+from .thumbnails import schedule_thumbnails
+from .timeline import (fan_out_author, fan_out_post, fan_out_posts_after,
+                       remove_author, sync_author)
+
+# Отправляется после bulk_create постов, который обходит post_save:
+# after_id - наибольший id поста до вставки, author_counts - число
+# новых постов по id авторов, group_ids - затронутые группы.
+posts_bulk_created = Signal(
+    providing_args=['after_id', 'author_counts', 'group_ids']
+)
+
+TRACKED_FIELDS = ('text', 'author_id', 'group_id', 'updated_at', 'image')
+# Поля автора и группы, которые выводятся в карточке поста.
+AUTHOR_CARD_FIELDS = ('username', 'first_name', 'last_name')
+GROUP_CARD_FIELDS = ('slug',)
+
+
+def changed_ids(instance, field):
+    """Старое и новое значение внешнего ключа, если пост его сменил."""
+    loaded = getattr(instance, '_loaded_values', {})
+    current = getattr(instance, field)
+    if field not in loaded or loaded[field] == current:
+        return set()
+    return {loaded[field], current} - {None}
+
+
+def image_changed(instance, created):
+    if not instance.image or 'image' in instance.get_deferred_fields():
+        return False
+    return created or getattr(instance, '_loaded_values', {}).get(
+        'image') != instance.image
+
+
+def text_changed(instance, created, update_fields):
+    if created:
+        return True
+    if update_fields is not None and 'text' not in update_fields:
+        return False
+    return getattr(instance, '_loaded_values', {}).get('text') != instance.text
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, update_fields, **kwargs):
+    loaded = getattr(instance, '_loaded_values', {})
+    PostsGeneration.objects.bump()
+    if text_changed(instance, created, update_fields):
+        index_post(instance)
+    if image_changed(instance, created):
+        # Миниатюры создаются в фоне, когда файл уже сохранен в базе.
+        transaction.on_commit(partial(schedule_thumbnails, instance.pk))
+    if loaded.get('updated_at'):
+        cache.delete(post_card_key(instance, loaded['updated_at']))
+    if created:
+        AuthorStats.objects.change_posts_count(instance.author_id, 1)
+        invalidate_feed_counts({instance.author_id},
+                               {instance.group_id} - {None})
+        fan_out_post(instance)
+    else:
+        authors = changed_ids(instance, 'author_id')
+        groups = changed_ids(instance, 'group_id')
+        if authors:
+            AuthorStats.objects.change_posts_count(
+                instance._loaded_values['author_id'], -1)
+            AuthorStats.objects.change_posts_count(instance.author_id, 1)
+            TimelineEntry.objects.filter(post_id=instance.pk).delete()
+            fan_out_post(instance)
+        if authors or groups:
+            invalidate_feed_counts(authors, groups, index=False)
+    deferred = instance.get_deferred_fields()
+    instance._loaded_values = {
+        **loaded,
+        **{field: getattr(instance, field)
+           for field in TRACKED_FIELDS if field not in deferred},
+    }
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    PostsGeneration.objects.bump()
+    unindex_post(instance.pk)
+    cache.delete(post_card_key(instance))
+    AuthorStats.objects.change_posts_count(instance.author_id, -1)
+    invalidate_feed_counts({instance.author_id}, {instance.group_id} - {None})
+
+
+@receiver(posts_bulk_created)
+def posts_bulk_saved(sender, after_id, author_counts, group_ids, **kwargs):
+    PostsGeneration.objects.bump()
+    index_posts_after(after_id)
+    AuthorStats.objects.add_posts_counts(author_counts)
+    fan_out_posts_after(after_id)
+    # Сигнал отправляется внутри транзакции импорта: до фиксации
+    # параллельный запрос снова закэшировал бы прежнее число постов.
+    transaction.on_commit(partial(
+        invalidate_feed_counts, list(author_counts), list(group_ids)))
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw, **kwargs):
+    if not created or raw:
+        return
+    AuthorStats.objects.change_followers_count(instance.author_id, 1)
+    followers = (AuthorStats.objects.filter(author_id=instance.author_id)
+                 .values_list('followers_count', flat=True).first())
+    if followers <= settings.TIMELINE_FANOUT_MAX_FOLLOWERS:
+        fan_out_author(instance.author_id, instance.user_id)
+    # Автор, ставший популярным, читается при выводе ленты: разложенные
+    # копии его постов убираются.
+    sync_author(instance.author_id, followers)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    AuthorStats.objects.change_followers_count(instance.author_id, -1)
+    remove_author(instance.author_id, instance.user_id)
+    followers = (AuthorStats.objects.filter(author_id=instance.author_id)
+                 .values_list('followers_count', flat=True).first())
+    # Автор, переставший быть популярным, снова читается из лент:
+    # раскладываем уже опубликованные посты.
+    sync_author(instance.author_id, followers or 0)
+
+
+def card_fields_changed(instance, fields, update_fields):
+    if instance.pk is None:
+        return False
+    if update_fields is not None and not set(update_fields) & set(fields):
+        return False
+    previous = (type(instance).objects.filter(pk=instance.pk)
+                .values_list(*fields).first())
+    current = tuple(getattr(instance, field) for field in fields)
+    return previous is not None and previous != current
+
+
+def touch_posts(post_ids=None, chunk_size=500, **lookups):
+    """Сдвигает updated_at постов по условию или по списку id."""
+    if post_ids is None:
+        Post.objects.filter(**lookups).touch()
+        return
+    for start in range(0, len(post_ids), chunk_size):
+        Post.objects.filter(pk__in=post_ids[start:start + chunk_size]).touch()
+
+
+# Старые значения сравниваются до записи, а посты сдвигаются только
+# после фиксации: иначе запрос между ними закэшировал бы карточку со
+# старым именем под новым updated_at.
+
+@receiver(pre_save, sender=User)
+def author_changing(sender, instance, raw, update_fields, **kwargs):
+    instance._card_changed = not raw and card_fields_changed(
+        instance, AUTHOR_CARD_FIELDS, update_fields)
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, **kwargs):
+    if getattr(instance, '_card_changed', False):
+        transaction.on_commit(partial(touch_posts, author_id=instance.pk))
+
+
+@receiver(pre_save, sender=Group)
+def group_changing(sender, instance, raw, update_fields, **kwargs):
+    instance._card_changed = not raw and card_fields_changed(
+        instance, GROUP_CARD_FIELDS, update_fields)
+
+
+@receiver(post_save, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    if getattr(instance, '_card_changed', False):
+        transaction.on_commit(partial(touch_posts, group_id=instance.pk))
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    # SET_NULL обновляет посты без сигналов, и после удаления посты
+    # группы уже не найти: запоминаем их заранее.
+    instance._post_ids = list(Post.objects.filter(
+        group_id=instance.pk).values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    transaction.on_commit(partial(touch_posts, instance._post_ids))
@@ -0,0 +1,34 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from posts.cache import post_card_key
+from posts.thumbnails import post_thumbnail
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_card(post):
+    """Карточка поста для лент, отрисованная один раз на версию поста.
+
+    Карточка с исходной картинкой вместо еще не готовой миниатюры
+    не кэшируется.
+    """
+    key = post_card_key(post)
+    card = cache.get(key)
+    if card is None:
+        thumbnail = post_thumbnail(post, 'card')
+        card = render_to_string('includes/post_card.html',
+                                {'post': post, 'thumbnail': thumbnail})
+        if thumbnail or not post.image:
+            cache.set(key, card, settings.POSTS_CARD_CACHE_TIMEOUT)
+    return mark_safe(card)
+
+
+@register.inclusion_tag('includes/post_image.html')
+def post_image(post, variant):
+    """Готовая миниатюра картинки поста; без нее - исходная картинка."""
+    return {'post': post, 'thumbnail': post_thumbnail(post, variant)}
@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class PostAdminChangelistTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin')
+        cls.groups = [Group.objects.create(title=f'Группа {i}',
+                                           slug=f'group-{i}')
+                      for i in range(5)]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def create_posts(self, count):
+        for i in range(count):
+            author, _ = User.objects.get_or_create(username=f'author{i}')
+            Post.objects.create(author=author, text=f'Пост {i}',
+                                group=self.groups[i % len(self.groups)])
+
+    def changelist_queries(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('admin:posts_post_changelist'), params)
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in queries.captured_queries]
+
+    def test_queries_do_not_depend_on_rows(self):
+        self.create_posts(2)
+        self.changelist_queries()
+        few = self.changelist_queries()
+        self.create_posts(30)
+        self.changelist_queries()
+        self.assertEqual(len(self.changelist_queries()), len(few))
+
+    def test_counts_are_cached(self):
+        self.create_posts(3)
+        for params in ({}, {'pub_date__gte': '2000-01-01 00:00:00+00:00'}):
+            with self.subTest(params=params):
+                self.changelist_queries(**params)
+                queries = self.changelist_queries(**params)
+                self.assertFalse([sql for sql in queries if 'COUNT(' in sql])
+
+    def test_group_is_edited_by_id(self):
+        self.create_posts(1)
+        response = self.client.get(reverse('admin:posts_post_changelist'))
+        self.assertContains(response, 'vForeignKeyRawIdAdminField')
+        self.assertContains(response, self.groups[0].title)
@@ -0,0 +1,206 @@
+import json
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from ..cache import feed_count_key
+from ..models import AuthorStats, Group, Post, get_posts_count
+from ..search import SearchResults
+from ..signals import posts_bulk_created
+
+User = get_user_model()
+
+
+class RebuildPostCountsTest(TestCase):
+    def test_rebuild_restores_counters(self):
+        author = User.objects.create_user(username='author')
+        Post.objects.bulk_create(
+            Post(author=author, text=f'Пост {i}') for i in range(4)
+        )
+        AuthorStats.objects.create(
+            author=User.objects.create_user(username='stale'),
+            posts_count=7
+        )
+        call_command('rebuild_post_counts', stdout=StringIO())
+        self.assertEqual(
+            dict(AuthorStats.objects.values_list('author__username',
+                                                 'posts_count')),
+            {'author': 4}
+        )
+
+
+class RebuildSearchIndexTest(TestCase):
+    def test_rebuild_indexes_bulk_created_posts(self):
+        author = User.objects.create_user(username='author')
+        Post.objects.bulk_create(
+            Post(author=author, text=f'Импортированный пост {i}')
+            for i in range(3)
+        )
+        self.assertEqual(SearchResults('импортированный').count(), 0)
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(SearchResults('импортированный').count(), 3)
+
+
+class ImportPostsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+
+    def import_posts(self, content, *args, suffix='.jsonl'):
+        with tempfile.NamedTemporaryFile('w', suffix=suffix,
+                                         encoding='utf-8') as file:
+            file.write(content)
+            file.flush()
+            call_command('import_posts', file.name, *args,
+                         stdout=StringIO(), stderr=StringIO())
+
+    def test_import_jsonl(self):
+        rows = [
+            {'text': 'Первый', 'author': 'author', 'group': 'group',
+             'pub_date': '2020-01-02T03:04:05'},
+            {'text': 'Второй', 'author': 'author', 'group': 'Новая группа'},
+            {'text': 'Без автора', 'author': 'nobody'},
+        ]
+        self.import_posts('\n'.join(json.dumps(row) for row in rows),
+                          '--batch-size', '2')
+        first = Post.objects.get(text='Первый')
+        self.assertEqual(first.group, self.group)
+        self.assertEqual(first.pub_date,
+                         datetime(2020, 1, 2, 3, 4, 5, tzinfo=timezone.utc))
+        second = Post.objects.get(text='Второй')
+        self.assertEqual(second.group.slug, 'novaya-gruppa')
+        self.assertFalse(Post.objects.filter(text='Без автора').exists())
+        self.assertEqual(get_posts_count(self.author), 2)
+        self.assertEqual(SearchResults('второй').count(), 1)
+
+    def test_import_csv_from_stdin_creates_authors(self):
+        content = 'text,author,group\nИз CSV,newcomer,Группа\n'
+        with mock.patch('sys.stdin', StringIO(content)):
+            call_command('import_posts', '-', '--format', 'csv',
+                         '--create-authors', stdout=StringIO())
+        post = Post.objects.get(text='Из CSV')
+        self.assertEqual(post.author.username, 'newcomer')
+        self.assertEqual(post.group, self.group)
+        self.assertFalse(post.author.has_usable_password())
+
+    def test_broken_json_line(self):
+        with self.assertRaises(CommandError):
+            self.import_posts('{"text": ')
+
+    def test_lookups_are_chunked(self):
+        rows = [{'text': f'Пост {i}', 'author': f'user{i}', 'group': 'group'}
+                for i in range(1200)]
+        with CaptureQueriesContext(connection) as queries:
+            self.import_posts('\n'.join(json.dumps(row) for row in rows),
+                              '--create-authors')
+        self.assertEqual(Post.objects.filter(group=self.group).count(), 1200)
+        self.assertLessEqual(max(query['sql'].count("'user")
+                                 for query in queries.captured_queries
+                                 if query['sql'].startswith('SELECT')), 500)
+
+    def test_group_title_matching_existing_slug(self):
+        Group.objects.create(title='Кошки', slug='cats')
+        rows = [{'text': 'Про кошек', 'author': 'author', 'group': 'Cats'}]
+        self.import_posts('\n'.join(json.dumps(row) for row in rows))
+        self.assertEqual(Post.objects.get(text='Про кошек').group.slug,
+                         'cats')
+        self.assertFalse(Group.objects.filter(title='Cats').exists())
+
+
+class ImportCacheInvalidationTest(TransactionTestCase):
+    def test_counts_are_invalidated_after_commit(self):
+        author = User.objects.create_user(username='author')
+        key = feed_count_key('index')
+        cache.set(key, 0)
+        with transaction.atomic():
+            Post.objects.bulk_create([Post(author=author, text='Пост')])
+            posts_bulk_created.send(sender=Post, after_id=0,
+                                    author_counts={author.pk: 1},
+                                    group_ids=set())
+            self.assertEqual(cache.get(key), 0)
+        self.assertIsNone(cache.get(key))
+
+
+class ExportPostsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.create(author=cls.author, text='Первый', group=cls.group)
+        Post.objects.create(author=cls.author, text='Второй')
+        Post.objects.create(
+            author=User.objects.create_user(username='other'), text='Чужой')
+
+    def test_export_author_jsonl(self):
+        out = StringIO()
+        call_command('export_posts', '--author', 'author',
+                     '--chunk-size', '1', stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([row['text'] for row in rows], ['Первый', 'Второй'])
+        self.assertEqual(rows[0]['group'], 'group')
+        self.assertEqual(rows[1]['author'], 'author')
+
+    def test_export_group_csv_roundtrip(self):
+        with tempfile.NamedTemporaryFile(suffix='.csv') as file:
+            call_command('export_posts', '--group', 'group', '--format',
+                         'csv', '--output', file.name, stderr=StringIO())
+            Post.objects.all().delete()
+            call_command('import_posts', file.name, stdout=StringIO())
+        post = Post.objects.get()
+        self.assertEqual((post.text, post.group), ('Первый', self.group))
+
+    def test_unknown_author(self):
+        with self.assertRaises(CommandError):
+            call_command('export_posts', '--author', 'nobody',
+                         stdout=StringIO())
+
+
+class SeedPostsTest(TestCase):
+    def seed(self, prefix, **options):
+        call_command('seed_posts', prefix=prefix, posts=300, users=20,
+                     groups=5, stdout=StringIO(), **options)
+        return list(Post.objects.filter(
+            author__username__startswith=f'{prefix}_'
+        ).order_by('pk').values_list('text', 'pub_date'))
+
+    def test_seed_is_reproducible_and_consistent(self):
+        first = self.seed('one')
+        self.assertEqual(len(first), 300)
+        self.assertEqual(self.seed('two'), first)
+        self.assertNotEqual(self.seed('three', seed=7), first)
+        self.assertEqual(
+            sum(AuthorStats.objects.values_list('posts_count', flat=True)),
+            900)
+        word = 'погода'
+        self.assertEqual(
+            SearchResults(word).count(),
+            sum(word in text.lower().split()
+                for text in Post.objects.values_list('text', flat=True)))
+
+    def test_skew_and_dates(self):
+        self.seed('skew', days=30, until='2020-02-01')
+        top = get_posts_count(User.objects.get(username='skew_user1'))
+        last = get_posts_count(User.objects.get(username='skew_user20'))
+        self.assertGreater(top, 5 * last)
+        dates = Post.objects.values_list('pub_date', flat=True)
+        self.assertGreaterEqual(min(dates),
+                                datetime(2020, 1, 2, tzinfo=timezone.utc))
+        self.assertLessEqual(max(dates),
+                             datetime(2020, 2, 1, tzinfo=timezone.utc))
+        self.assertGreater(len(set(dates)), 290)
+
+    def test_existing_prefix(self):
+        self.seed('dup')
+        with self.assertRaises(CommandError):
+            self.seed('dup')
@@ -1,12 +1,36 @@
+import shutil
+import tempfile
 from http import HTTPStatus
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from ..models import Group, Post
 from ..forms import PostForm
 
 User = get_user_model()
 
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+# Ключи миниатюр тестов - в памяти процесса, а не в общем каталоге.
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'thumbnails': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'thumbnails',
+    },
+}
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
 
 class PostCreateFormTests(TestCase):
     @classmethod
@@ -122,3 +146,34 @@ class PostCreateFormTests(TestCase):
         self.assertNotEqual(Post.objects.count(),
                             posts_count + 1,
                             error_name2)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, CACHES=TEST_CACHES)
+class PostImageFormTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.client.force_login(self.author)
+
+    def test_create_post_with_image(self):
+        response = self.client.post(reverse('posts:post_create'), data={
+            'text': 'Пост с картинкой',
+            'image': SimpleUploadedFile('small.gif', SMALL_GIF,
+                                        content_type='image/gif'),
+        })
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        post = Post.objects.get(text='Пост с картинкой')
+        self.assertEqual(post.image.name, 'posts/small.gif')
+
+    def test_not_an_image_is_rejected(self):
+        response = self.client.post(reverse('posts:post_create'), data={
+            'text': 'Пост с файлом',
+            'image': SimpleUploadedFile('file.gif', b'not an image',
+                                        content_type='image/gif'),
+        })
+        self.assertTrue(response.context['form'].errors['image'])
+        self.assertFalse(Post.objects.exists())
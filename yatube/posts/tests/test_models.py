@@ -1,7 +1,14 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.db.models import Max
+from django.test import TestCase, override_settings
 
-from ..models import Group, Post
+from ..models import (AuthorStats, Follow, Group, Post, TimelineEntry,
+                      get_posts_count)
+from ..signals import posts_bulk_created
+from ..timeline import FollowFeed
 
 User = get_user_model()
 
@@ -30,3 +37,133 @@ class PostModelTest(TestCase):
         group = PostModelTest.group
         expected_object_name = group.title
         self.assertEqual(expected_object_name, str(group))
+
+
+class AuthorStatsTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.other = User.objects.create_user(username='other')
+
+    def posts_count(self, user):
+        return get_posts_count(
+            User.objects.select_related('post_stats').get(pk=user.pk)
+        )
+
+    def test_counter_follows_create_and_delete(self):
+        posts = [Post.objects.create(author=self.author, text=f'Пост {i}')
+                 for i in range(3)]
+        self.assertEqual(self.posts_count(self.author), 3)
+        posts[0].delete()
+        Post.objects.filter(pk=posts[1].pk).delete()
+        self.assertEqual(self.posts_count(self.author), 1)
+
+    def test_counter_follows_author_change(self):
+        post = Post.objects.create(author=self.author, text='Пост')
+        post = Post.objects.get(pk=post.pk)
+        post.author = self.other
+        post.save()
+        post.save()
+        self.assertEqual(self.posts_count(self.author), 0)
+        self.assertEqual(self.posts_count(self.other), 1)
+
+    def test_counter_is_created_from_existing_posts(self):
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Пост {i}') for i in range(2)
+        )
+        Post.objects.create(author=self.author, text='Пост')
+        self.assertEqual(self.posts_count(self.author), 3)
+
+    def test_author_without_posts(self):
+        self.assertEqual(self.posts_count(self.other), 0)
+        self.assertFalse(AuthorStats.objects.filter(author=self.other))
+
+
+@override_settings(TIMELINE_FANOUT_MAX_FOLLOWERS=2)
+class TimelineTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.popular = User.objects.create_user(username='popular')
+        self.reader = User.objects.create_user(username='reader')
+        self.others = [User.objects.create_user(username=f'other{i}')
+                       for i in range(2)]
+
+    def feed(self, user=None):
+        return [post.text for post in FollowFeed(user or self.reader)[:20]]
+
+    def entries(self, author):
+        return TimelineEntry.objects.filter(post__author=author).count()
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        Post.objects.create(author=self.author, text='Старый')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.create(author=self.author, text='Новый')
+        self.assertEqual(self.feed(), ['Новый', 'Старый'])
+        self.assertEqual(self.feed(self.others[0]), [])
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertEqual(self.feed(), [])
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    def test_popular_author_is_read_on_demand(self):
+        Post.objects.create(author=self.popular, text='Популярный 1')
+        for user in (self.reader, *self.others):
+            Follow.objects.create(user=user, author=self.popular)
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.create(author=self.author, text='Обычный')
+        Post.objects.create(author=self.popular, text='Популярный 2')
+        self.assertEqual(self.entries(self.popular), 0)
+        self.assertEqual(self.feed(),
+                         ['Популярный 2', 'Обычный', 'Популярный 1'])
+        self.assertEqual(FollowFeed(self.reader).count(), 3)
+
+    def test_author_returns_to_fan_out(self):
+        Post.objects.create(author=self.popular, text='Пост')
+        for user in (self.reader, *self.others):
+            Follow.objects.create(user=user, author=self.popular)
+        Follow.objects.filter(user=self.others[0]).delete()
+        self.assertEqual(self.entries(self.popular), 2)
+        self.assertEqual(self.feed(), ['Пост'])
+
+    def test_lowered_threshold_does_not_duplicate_posts(self):
+        Post.objects.create(author=self.author, text='Пост')
+        Follow.objects.create(user=self.reader, author=self.author)
+        with override_settings(TIMELINE_FANOUT_MAX_FOLLOWERS=0):
+            self.assertEqual(self.feed(), ['Пост'])
+            self.assertEqual(FollowFeed(self.reader).count(), 1)
+            call_command('rebuild_timeline', stdout=StringIO())
+            self.assertEqual(self.entries(self.author), 0)
+            self.assertEqual(self.feed(), ['Пост'])
+
+    def test_skipped_threshold_is_caught_up(self):
+        Post.objects.create(author=self.popular, text='Пост')
+        for user in (self.reader, *self.others):
+            Follow.objects.create(user=user, author=self.popular)
+        # Параллельные отписки: счетчик минует порог без сигнала на нем.
+        AuthorStats.objects.change_followers_count(self.popular.pk, -1)
+        Follow.objects.filter(user=self.others[0]).delete()
+        self.assertEqual(self.entries(self.popular), 2)
+        self.assertEqual(self.feed(), ['Пост'])
+
+    def test_rebuild_restores_fan_out(self):
+        Post.objects.create(author=self.popular, text='Пост')
+        for user in (self.reader, *self.others):
+            Follow.objects.create(user=user, author=self.popular)
+        with override_settings(TIMELINE_FANOUT_MAX_FOLLOWERS=5):
+            call_command('rebuild_timeline', stdout=StringIO())
+        self.assertEqual(self.entries(self.popular), 3)
+
+    def test_bulk_created_posts_are_fanned_out(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        after_id = Post.objects.aggregate(last=Max('id'))['last'] or 0
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Пост {i}') for i in range(3))
+        posts_bulk_created.send(sender=Post, after_id=after_id,
+                                author_counts={self.author.pk: 3},
+                                group_ids=[])
+        self.assertEqual(self.entries(self.author), 3)
+
+    def test_follower_counter_survives_rebuild(self):
+        Post.objects.create(author=self.author, text='Пост')
+        Follow.objects.create(user=self.reader, author=self.author)
+        AuthorStats.objects.rebuild()
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.author).followers_count, 1)
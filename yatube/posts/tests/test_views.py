@@ -1,8 +1,27 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from http import HTTPStatus
+from io import StringIO
+from unittest import mock
+
 from django import forms
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from ..models import Group, Post
+from django.utils import timezone
+from django.utils.http import parse_http_date
+from ..cache import feed_count_key, post_card_key
+from ..models import Follow, Group, Post
+from ..thumbnails import generate_thumbnails, ready_thumbnail
+from .test_forms import SMALL_GIF, TEST_CACHES
 
 User = get_user_model()
 
@@ -28,6 +47,7 @@ class PostTests(TestCase):
                 slug='slug2'))
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
@@ -146,6 +166,7 @@ class PaginatorViewsTest(TestCase):
         Post.objects.bulk_create(cls.posts)
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
 
         self.authorized_client = Client()
@@ -172,3 +193,798 @@ class PaginatorViewsTest(TestCase):
         for tested_url in list_urls.keys():
             response = self.client.get(tested_url)
             self.assertEqual(len(response.context.get('page_obj')), 3)
+
+    def test_page_window_is_bounded(self):
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=self.author) for i in range(100)
+        )
+        response = self.client.get(reverse('posts:index'), {'page': 6})
+        page_obj = response.context['page_obj']
+        self.assertEqual(list(page_obj.page_window), [4, 5, 6, 7, 8])
+        self.assertNotContains(response, '?page=3"')
+        self.assertContains(response, '?page=12"')
+
+    def test_count_is_cached_until_posts_change(self):
+        url = reverse('posts:group_posts', kwargs={'slug': 'slug'})
+        self.client.get(url)
+        with self.assertNumQueries(3):
+            self.client.get(url, {'page': 2})
+        Post.objects.create(text='Новый пост', author=self.author,
+                            group=self.group)
+        response = self.client.get(url, {'page': 2})
+        self.assertEqual(response.context['page_obj'].paginator.count, 14)
+        Post.objects.filter(group=self.group).first().delete()
+        response = self.client.get(url, {'page': 2})
+        self.assertEqual(response.context['page_obj'].paginator.count, 13)
+
+
+@override_settings(POSTS_PAGINATION='cursor')
+class CursorPaginatorViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth',)
+        cls.group = Group.objects.create(
+            title=('Заголовок для тестовой группы'),
+            slug='slug',
+            description='Тестовое описание')
+        Post.objects.bulk_create(
+            Post(text=f'Тестовый пост {i}', author=cls.author,
+                 group=cls.group)
+            for i in range(13)
+        )
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': 'slug'}),
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def walk_forward(self, url):
+        ids = []
+        cursor = None
+        while True:
+            data = {'cursor': cursor} if cursor else {}
+            page_obj = self.client.get(url, data).context['page_obj']
+            ids.extend(post.pk for post in page_obj)
+            cursor = page_obj.next_cursor
+            if not cursor:
+                return ids
+
+    def test_pages_follow_cursors(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                first_page = self.client.get(url).context['page_obj']
+                self.assertEqual(len(first_page), 10)
+                self.assertFalse(first_page.has_previous())
+                second_page = self.client.get(
+                    url, {'cursor': first_page.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(len(second_page), 3)
+                self.assertFalse(second_page.has_next())
+                back_page = self.client.get(
+                    url, {'cursor': second_page.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual([post.pk for post in back_page],
+                                 [post.pk for post in first_page])
+
+    def test_equal_pub_dates_are_not_skipped(self):
+        Post.objects.update(pub_date=Post.objects.first().pub_date)
+        ids = self.walk_forward(reverse('posts:index'))
+        self.assertEqual(
+            ids,
+            list(Post.objects.order_by('-pk').values_list('pk', flat=True))
+        )
+
+    def test_broken_cursor_returns_first_page(self):
+        response = self.client.get(reverse('posts:index'),
+                                   {'cursor': 'not-a-cursor'})
+        self.assertEqual(len(response.context['page_obj']), 10)
+        self.assertFalse(response.context['page_obj'].has_previous())
+
+
+class FeedQueriesTest(TestCase):
+    FEED_QUERIES = {
+        'posts:index': 2,
+        'posts:group_posts': 3,
+        'posts:profile': 3,
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(title='Группа', slug='slug')
+        cls.urls = {
+            'posts:index': reverse('posts:index'),
+            'posts:group_posts': reverse('posts:group_posts',
+                                         kwargs={'slug': 'slug'}),
+            'posts:profile': reverse('posts:profile',
+                                     kwargs={'username': 'author'}),
+        }
+
+    def setUp(self):
+        cache.clear()
+
+    def create_posts(self, count):
+        for i in range(count):
+            author, _ = User.objects.get_or_create(
+                username='author' if i % 2 == 0 else f'author{i}',
+                defaults={'first_name': 'Имя', 'last_name': 'Фамилия'})
+            Post.objects.create(text=f'Пост {i}', author=author,
+                                group=self.group)
+
+    def assert_feed_queries(self):
+        for name, url in self.urls.items():
+            with self.subTest(url=url):
+                self.client.get(url)
+                with self.assertNumQueries(self.FEED_QUERIES[name]):
+                    self.client.get(url)
+
+    def test_queries_do_not_depend_on_page_size(self):
+        self.create_posts(2)
+        self.assert_feed_queries()
+        self.create_posts(20)
+        self.assert_feed_queries()
+
+
+class PostSearchViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin')
+        cls.fish = Post.objects.create(
+            author=cls.author, text='Рыба рыбе рознь, а рыбак рыбака видит')
+        cls.other = Post.objects.create(
+            author=cls.author, text='Рыба плавает в воде')
+        cls.unrelated = Post.objects.create(
+            author=cls.author, text='Совсем о другом')
+
+    def search(self, query, **params):
+        return self.client.get(reverse('posts:post_search'),
+                               {'q': query, **params})
+
+    def test_results_are_ranked(self):
+        page_obj = self.search('рыб').context['page_obj']
+        self.assertEqual([post.pk for post in page_obj],
+                         [self.fish.pk, self.other.pk])
+
+    def test_index_follows_edit_and_delete(self):
+        post = Post.objects.get(pk=self.unrelated.pk)
+        post.text = 'Теперь и здесь про рыбу'
+        post.save()
+        self.assertEqual(self.search('рыбу').context['page_obj'][0], post)
+        self.assertEqual(len(self.search('другом').context['page_obj']), 0)
+        post.delete()
+        self.assertEqual(len(self.search('рыбу').context['page_obj']), 0)
+
+    def test_query_syntax_is_escaped(self):
+        for query in ('"', 'рыба OR', 'NEAR(', '*', ''):
+            with self.subTest(query=query):
+                response = self.search(query)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_pages_keep_query(self):
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Рыба номер {i}')
+            for i in range(12)
+        )
+        call_command('rebuild_search_index', stdout=StringIO())
+        response = self.search('рыба', page=2)
+        self.assertEqual(response.context['page_obj'].paginator.count, 14)
+        self.assertContains(response, '?q=%D1%80%D1%8B%D0%B1%D0%B0&amp;page=1')
+
+    def test_admin_search_uses_index(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'плавает'})
+        self.assertEqual(list(response.context['cl'].result_list),
+                         [self.other])
+
+
+class PostCardCacheTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.group = Group.objects.create(title='Группа', slug='slug')
+        self.author = User.objects.create_user(
+            username='auth', first_name='Лев', last_name='Толстой')
+        self.post = Post.objects.create(author=self.author, text='Старый',
+                                        group=self.group)
+        self.client.get(reverse('posts:index'))
+
+    def get_index(self):
+        return self.client.get(reverse('posts:index'))
+
+    def test_card_is_served_from_cache(self):
+        Post.objects.filter(pk=self.post.pk).update(text='Без сигналов')
+        self.assertContains(self.get_index(), 'Старый')
+
+    def test_card_follows_post_save(self):
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Новый'
+        post.save()
+        self.assertContains(self.get_index(), 'Новый')
+        post.delete()
+        self.assertNotContains(self.get_index(), 'Новый')
+
+    def test_card_follows_author_name(self):
+        self.author.first_name = 'Алексей'
+        self.author.save()
+        self.assertContains(self.get_index(), 'Алексей Толстой')
+
+    def test_posts_are_touched_after_commit(self):
+        updated_at = Post.objects.get(pk=self.post.pk).updated_at
+        with transaction.atomic():
+            self.author.first_name = 'Алексей'
+            self.author.save()
+            self.assertEqual(Post.objects.get(pk=self.post.pk).updated_at,
+                             updated_at)
+        self.assertGreater(Post.objects.get(pk=self.post.pk).updated_at,
+                           updated_at)
+
+    def test_card_follows_group(self):
+        self.group.slug = 'new-slug'
+        self.group.save()
+        self.assertContains(self.get_index(), '/group/new-slug/')
+        self.group.delete()
+        self.assertNotContains(self.get_index(), '/group/')
+
+
+@override_settings(POSTS_PAGE_CACHE_TIMEOUT=60)
+class PageCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='auth')
+        self.group = Group.objects.create(title='Группа', slug='slug')
+        self.other_group = Group.objects.create(title='Другая', slug='other')
+        self.post = Post.objects.create(author=self.author, text='Пост',
+                                        group=self.group)
+        self.urls = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group_posts', kwargs={'slug': 'slug'}),
+            'other_group': reverse('posts:group_posts',
+                                   kwargs={'slug': 'other'}),
+            'profile': reverse('posts:profile', kwargs={'username': 'auth'}),
+            'post': reverse('posts:post_detail',
+                            kwargs={'post_id': self.post.pk}),
+        }
+        for url in self.urls.values():
+            self.client.get(url)
+
+    def test_anonymous_pages_are_cached(self):
+        for name in ('index', 'group', 'profile', 'post'):
+            with self.subTest(page=name):
+                with self.assertNumQueries(1):
+                    self.client.get(self.urls[name])
+
+    def test_authorized_pages_are_not_cached(self):
+        self.client.force_login(self.author)
+        response = self.client.get(self.urls['group'])
+        self.assertIsNotNone(response.context)
+        self.assertContains(response, 'Пользователь: auth')
+
+    def test_write_invalidates_only_touched_pages(self):
+        Post.objects.create(author=self.author, text='Новый пост',
+                            group=self.group)
+        for name in ('index', 'group', 'profile', 'post'):
+            with self.subTest(page=name):
+                response = self.client.get(self.urls[name])
+                self.assertIsNotNone(response.context)
+        with self.assertNumQueries(1):
+            self.client.get(self.urls['other_group'])
+
+    def test_group_change_invalidates_group_page(self):
+        self.group.description = 'Новое описание'
+        self.group.save()
+        self.assertContains(self.client.get(self.urls['group']),
+                            'Новое описание')
+
+    def test_stats_count_hits_and_misses(self):
+        self.client.get(self.urls['index'])
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin')
+        self.client.force_login(admin)
+        stats = self.client.get(
+            reverse('posts:page_cache_statistics')).json()
+        self.assertEqual(stats['index'], {'hits': 1, 'misses': 1})
+        self.assertEqual(stats['post_detail'], {'hits': 0, 'misses': 1})
+
+
+class PostExportViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.create(author=cls.author, text='Пост, "с запятой"',
+                            group=cls.group)
+
+    def setUp(self):
+        self.client.force_login(self.author)
+
+    def test_profile_export_streams_jsonl(self):
+        response = self.client.get(
+            reverse('posts:profile_export', args=[self.author.username]))
+        self.assertTrue(response.streaming)
+        self.assertIn('posts-auth.jsonl', response['Content-Disposition'])
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn('"text": "Пост, \\"с запятой\\""', body)
+
+    def test_group_export_csv(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(
+            reverse('posts:group_export', args=[self.group.slug]),
+            {'format': 'csv'})
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'text,author,group,pub_date')
+        self.assertTrue(
+            lines[1].startswith('"Пост, ""с запятой""",auth,group'))
+
+    def test_export_requires_login(self):
+        self.client.logout()
+        response = self.client.get(
+            reverse('posts:group_export', args=[self.group.slug]))
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_export_is_forbidden_to_other_users(self):
+        self.client.force_login(self.other)
+        for url in (reverse('posts:profile_export', args=['auth']),
+                    reverse('posts:group_export', args=['group'])):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code,
+                                 HTTPStatus.FORBIDDEN)
+        self.client.force_login(self.author)
+        response = self.client.get(
+            reverse('posts:group_export', args=['group']))
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+
+    def test_staff_exports_any_author(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(
+            reverse('posts:profile_export', args=['auth']))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='auth')
+        self.group = Group.objects.create(title='Группа', slug='slug')
+        self.post = Post.objects.create(author=self.author, text='Пост',
+                                        group=self.group)
+        self.urls = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group_posts', kwargs={'slug': 'slug'}),
+            'profile': reverse('posts:profile', kwargs={'username': 'auth'}),
+            'post': reverse('posts:post_detail',
+                            kwargs={'post_id': self.post.pk}),
+        }
+
+    def test_unchanged_pages_answer_304_without_feed_queries(self):
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                etag = self.client.get(url)['ETag']
+                with self.assertNumQueries(1):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code,
+                                 HTTPStatus.NOT_MODIFIED)
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get(self.urls['index'])['Last-Modified']
+        response = self.client.get(self.urls['index'],
+                                   HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_last_modified_advances_after_deleting_newest_post(self):
+        newest = Post.objects.create(author=self.author, text='Новый')
+        last_modified = self.client.get(self.urls['index'])['Last-Modified']
+        with mock.patch('django.utils.timezone.now',
+                        return_value=timezone.now() + timedelta(seconds=2)):
+            newest.delete()
+        response = self.client.get(self.urls['index'],
+                                   HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertGreater(parse_http_date(response['Last-Modified']),
+                           parse_http_date(last_modified))
+
+    def test_list_pages_without_monotonic_time_omit_last_modified(self):
+        for name in ('group', 'profile', 'post'):
+            with self.subTest(page=name):
+                response = self.client.get(self.urls[name])
+                self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_index_freshness_does_not_count_posts(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.urls['index'], HTTP_IF_NONE_MATCH='"x"')
+        self.assertNotIn('COUNT', queries.captured_queries[0]['sql'])
+
+    def test_write_changes_etag(self):
+        etags = {name: self.client.get(url)['ETag']
+                 for name, url in self.urls.items()}
+        self.post.text = 'Новый текст'
+        self.post.save()
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[name])
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_write_without_cache_invalidation_changes_etag(self):
+        # Запись из другого процесса не трогает локальный кэш.
+        etags = {name: self.client.get(url)['ETag']
+                 for name, url in self.urls.items()}
+        Post.objects.filter(pk=self.post.pk).update(
+            text='Новый текст', updated_at=timezone.now())
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[name])
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_delete_changes_etag(self):
+        # Удаляется не последний измененный пост: MAX(updated_at) прежний.
+        Post.objects.create(author=self.author, text='Другой',
+                            group=self.group)
+        etags = {name: self.client.get(url)['ETag']
+                 for name, url in self.urls.items() if name != 'post'}
+        self.post.delete()
+        for name, etag in etags.items():
+            with self.subTest(page=name):
+                response = self.client.get(self.urls[name],
+                                           HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_follow_changes_profile_etag(self):
+        reader = User.objects.create_user(username='reader')
+        self.client.force_login(reader)
+        etag = self.client.get(self.urls['profile'])['ETag']
+        Follow.objects.create(user=reader, author=self.author)
+        response = self.client.get(self.urls['profile'],
+                                   HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_etag_depends_on_user(self):
+        etag = self.client.get(self.urls['index'])['ETag']
+        self.client.force_login(self.author)
+        response = self.client.get(self.urls['index'],
+                                   HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_depends_on_csrf_secret(self):
+        # После повторного входа CSRF-секрет другой, и форма подписки
+        # в сохраненной браузером странице была бы с чужим токеном.
+        self.client.force_login(User.objects.create_user(username='reader'))
+        self.client.cookies[settings.CSRF_COOKIE_NAME] = 'a' * 64
+        etag = self.client.get(self.urls['profile'])['ETag']
+        self.client.cookies[settings.CSRF_COOKIE_NAME] = 'b' * 64
+        response = self.client.get(self.urls['profile'],
+                                   HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+
+class PostFeedsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='auth')
+        self.group = Group.objects.create(title='Группа', slug='slug')
+        self.post = Post.objects.create(author=self.author, text='Первый',
+                                        group=self.group)
+        self.urls = {
+            'index_rss': reverse('posts:index_rss'),
+            'index_atom': reverse('posts:index_atom'),
+            'group_rss': reverse('posts:group_rss', args=['slug']),
+            'group_atom': reverse('posts:group_atom', args=['slug']),
+            'profile_rss': reverse('posts:profile_rss', args=['auth']),
+            'profile_atom': reverse('posts:profile_atom', args=['auth']),
+        }
+
+    def test_feeds_list_posts(self):
+        for name, url in self.urls.items():
+            with self.subTest(feed=name):
+                response = self.client.get(url)
+                self.assertContains(response, '<title>Первый</title>')
+                self.assertContains(response, reverse(
+                    'posts:post_detail', args=[self.post.pk]))
+
+    def test_feed_bodies_are_cached_until_new_post(self):
+        for url in self.urls.values():
+            self.client.get(url)
+        for name, url in self.urls.items():
+            with self.subTest(feed=name):
+                with self.assertNumQueries(1):
+                    self.client.get(url)
+        Post.objects.create(author=self.author, text='Второй',
+                            group=self.group)
+        for name, url in self.urls.items():
+            with self.subTest(feed=name):
+                self.assertContains(self.client.get(url), 'Второй')
+
+    def test_cached_bodies_follow_writes_from_other_processes(self):
+        for url in self.urls.values():
+            self.client.get(url)
+        # bulk_create обходит сигналы, как запись в другом процессе,
+        # который не трогает локальный кэш.
+        Post.objects.bulk_create([Post(author=self.author, text='Второй',
+                                       group=self.group)])
+        for name, url in self.urls.items():
+            with self.subTest(feed=name):
+                self.assertContains(self.client.get(url), 'Второй')
+
+    def test_conditional_get(self):
+        response = self.client.get(self.urls['index_rss'])
+        response = self.client.get(
+            self.urls['index_rss'],
+            HTTP_IF_NONE_MATCH=response['ETag'],
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_unknown_group(self):
+        response = self.client.get(reverse('posts:group_rss',
+                                           args=['missing']))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_pages_link_feeds(self):
+        response = self.client.get(reverse('posts:group_posts',
+                                           args=['slug']))
+        self.assertContains(response, f'href="{self.urls["group_rss"]}"')
+
+
+@override_settings(QUERY_BUDGET_MODE='raise')
+class QueryBudgetViewsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='auth')
+        self.group = Group.objects.create(title='Группа', slug='slug')
+        for i in range(12):
+            Post.objects.create(author=self.author, text=f'Пост {i}',
+                                group=self.group)
+
+    def test_pages_stay_within_budget(self):
+        post = Post.objects.first()
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': 'slug'}),
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+            reverse('posts:post_search') + '?q=пост',
+        ]
+        for client_user in (None, self.author):
+            if client_user:
+                self.client.force_login(client_user)
+            for url in urls:
+                with self.subTest(url=url, user=client_user):
+                    cache.clear()
+                    self.assertEqual(self.client.get(url).status_code,
+                                     HTTPStatus.OK)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaReadsViewsTest(TransactionTestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='auth')
+        self.group = Group.objects.create(title='Группа', slug='slug')
+        self.post = Post.objects.create(author=self.author, text='Пост',
+                                        group=self.group)
+        self.urls = [
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': 'slug'}),
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        ]
+
+    def queries(self, client, url):
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            cache.clear()
+            self.assertEqual(client.get(url).status_code, HTTPStatus.OK)
+        return len(primary), len(replica)
+
+    def test_get_views_read_from_replica(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                primary, replica = self.queries(self.client, url)
+                self.assertEqual(primary, 0)
+                self.assertGreater(replica, 0)
+
+    def test_validators_and_page_cache_read_replica(self):
+        # Свежесть страницы читается с той же реплики, что и содержимое.
+        with override_settings(POSTS_PAGE_CACHE_TIMEOUT=60):
+            for url in self.urls:
+                with self.subTest(url=url):
+                    etag = self.client.get(url)['ETag']
+                    with CaptureQueriesContext(
+                            connections['default']) as primary:
+                        response = self.client.get(url)
+                        self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                    self.assertEqual(len(primary), 0)
+                    self.assertEqual(response['ETag'], etag)
+
+    @override_settings(POSTS_REPLICA_COUNT_CACHE_TIMEOUT=5)
+    def test_counts_read_from_replica_are_cached_briefly(self):
+        cache.clear()
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            self.client.get(self.urls[0])
+        cache_set.assert_any_call(feed_count_key('index'), 1, 5)
+        with CaptureQueriesContext(connections['replica']) as replica:
+            self.client.get(self.urls[0] + '?page=1')
+        self.assertFalse(any('COUNT' in query['sql']
+                             for query in replica.captured_queries))
+
+    def test_reads_stick_to_primary_after_post(self):
+        self.client.force_login(self.author)
+        self.client.post(reverse('posts:post_create'),
+                         data={'text': 'Новый пост'})
+        self.assertIn('db_primary', self.client.cookies)
+        for url in self.urls:
+            with self.subTest(url=url):
+                primary, replica = self.queries(self.client, url)
+                self.assertGreater(primary, 0)
+                self.assertEqual(replica, 0)
+
+
+class FollowViewsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='auth')
+        self.reader = User.objects.create_user(username='reader')
+        self.client.force_login(self.reader)
+
+    def follow(self, action='profile_follow', username='auth'):
+        return self.client.post(reverse(f'posts:{action}',
+                                        kwargs={'username': username}))
+
+    def test_follow_and_unfollow(self):
+        self.assertRedirects(self.follow(), reverse(
+            'posts:profile', kwargs={'username': 'auth'}))
+        self.follow()
+        self.assertEqual(Follow.objects.filter(user=self.reader).count(), 1)
+        response = self.client.get(reverse('posts:profile',
+                                           kwargs={'username': 'auth'}))
+        self.assertTrue(response.context['following'])
+        self.follow('profile_unfollow')
+        self.assertFalse(Follow.objects.exists())
+
+    def test_cannot_follow_self(self):
+        self.follow(username='reader')
+        self.assertFalse(Follow.objects.exists())
+
+    def test_follow_requires_post(self):
+        response = self.client.get(reverse('posts:profile_follow',
+                                           kwargs={'username': 'auth'}))
+        self.assertEqual(response.status_code, HTTPStatus.METHOD_NOT_ALLOWED)
+
+    def test_follow_index_shows_followed_authors(self):
+        other = User.objects.create_user(username='other')
+        self.follow()
+        Post.objects.create(author=self.author, text='Пост автора')
+        Post.objects.create(author=other, text='Чужой пост')
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual([post.text for post in response.context['page_obj']],
+                         ['Пост автора'])
+        self.client.force_login(other)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_follow_index_pages(self):
+        self.follow()
+        for i in range(13):
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+        response = self.client.get(reverse('posts:follow_index') + '?page=2')
+        self.assertEqual(response.context['page_obj'].paginator.count, 13)
+        self.assertEqual([post.text for post in response.context['page_obj']],
+                         ['Пост 2', 'Пост 1', 'Пост 0'])
+
+    def test_follow_index_count_follows_new_and_deleted_posts(self):
+        self.follow()
+        for i in range(10):
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+        url = reverse('posts:follow_index')
+        page = self.client.get(url).context['page_obj']
+        self.assertFalse(page.has_other_pages())
+        last = Post.objects.create(author=self.author, text='Одиннадцатый')
+        page = self.client.get(url).context['page_obj']
+        self.assertEqual(page.paginator.count, 11)
+        self.assertTrue(page.has_other_pages())
+        last.delete()
+        page = self.client.get(url).context['page_obj']
+        self.assertEqual(page.paginator.count, 10)
+
+
+@override_settings(POSTS_THUMBNAIL_WORKERS=0, CACHES=TEST_CACHES)
+class PostThumbnailTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        caches['thumbnails'].clear()
+        self.author = User.objects.create_user(username='auth')
+        self.post = Post.objects.create(
+            author=self.author, text='Пост с картинкой',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF,
+                                     content_type='image/gif'),
+        )
+
+    @mock.patch('posts.thumbnails.schedule_thumbnails')
+    def test_feed_does_not_wait_for_thumbnails(self, schedule):
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, self.post.image.url)
+        schedule.assert_called_with(self.post.pk)
+        self.assertIsNone(cache.get(post_card_key(self.post)))
+
+        generate_thumbnails(self.post.pk)
+        self.post.refresh_from_db()
+        thumbnail = ready_thumbnail(self.post.image, 'card')
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, thumbnail.url)
+        self.assertIsNotNone(cache.get(post_card_key(self.post)))
+
+    def test_thumbnail_lookup_does_not_query_database(self):
+        generate_thumbnails(self.post.pk)
+        with self.assertNumQueries(0):
+            for variant in ('card', 'detail'):
+                self.assertIsNotNone(ready_thumbnail(self.post.image,
+                                                     variant))
+        response = self.client.get(reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}))
+        self.assertContains(
+            response, ready_thumbnail(self.post.image, 'detail').url)
+
+    def test_lost_thumbnail_key_is_regenerated(self):
+        self.assertIsNone(ready_thumbnail(self.post.image, 'card'))
+        self.client.get(reverse('posts:index'))
+        self.assertIsNotNone(ready_thumbnail(self.post.image, 'card'))
+
+    def test_restored_thumbnail_key_does_not_touch_post(self):
+        generate_thumbnails(self.post.pk)
+        self.post.refresh_from_db()
+        etag = self.client.get(reverse('posts:index'))['ETag']
+        caches['thumbnails'].clear()
+        cache.clear()
+        generate_thumbnails(self.post.pk)
+        self.assertIsNotNone(ready_thumbnail(self.post.image, 'card'))
+        self.assertEqual(Post.objects.get(pk=self.post.pk).updated_at,
+                         self.post.updated_at)
+        self.assertEqual(self.client.get(reverse('posts:index'))['ETag'],
+                         etag)
+
+
+@override_settings(POSTS_THUMBNAIL_WORKERS=0, CACHES=TEST_CACHES)
+class PostThumbnailCommitTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        caches['thumbnails'].clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+    def test_thumbnails_generated_after_commit(self):
+        author = User.objects.create_user(username='auth')
+        post = Post.objects.create(
+            author=author, text='Пост с картинкой',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF,
+                                     content_type='image/gif'),
+        )
+        for variant in ('card', 'detail'):
+            self.assertIsNotNone(ready_thumbnail(post.image, variant))
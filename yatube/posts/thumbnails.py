@@ -0,0 +1,151 @@
+"""Миниатюры картинок постов без генерации во время запроса.
+
+Варианты из POSTS_THUMBNAILS создаются в фоновом потоке после
+сохранения поста (schedule_thumbnails). Шаблоны берут только готовые
+миниатюры (ready_thumbnail) и, пока их нет, показывают исходную
+картинку.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import connections
+from sorl.thumbnail import base, default, get_thumbnail
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import KVStoreBase
+
+from .models import Post
+
+logger = logging.getLogger('posts.thumbnails')
+
+PENDING_KEY = 'posts:thumbnails-pending:{}'
+# Сколько секунд не ставить повторно в очередь один и тот же пост.
+PENDING_TIMEOUT = 60
+
+executor = None
+executor_lock = threading.Lock()
+
+
+class CacheKVStore(KVStoreBase):
+    """Хранилище sorl-thumbnail только в кэше THUMBNAIL_CACHE.
+
+    В отличие от cached_db не ходит в базу при промахе. Кэш должен быть
+    общим для процессов (settings.CACHES['thumbnails']), иначе каждый
+    перезапуск заново ставит генерацию в очередь. Потерянная запись
+    восстанавливается фоновой генерацией: файл миниатюры уже существует,
+    и sorl только записывает ключ заново. Перечислять ключи кэш не
+    умеет, поэтому thumbnail cleanup здесь ничего не делает.
+    """
+
+    @property
+    def cache(self):
+        return caches[thumbnail_settings.THUMBNAIL_CACHE]
+
+    def _get_raw(self, key):
+        return self.cache.get(key)
+
+    def _set_raw(self, key, value):
+        self.cache.set(key, value, timeout=None)
+
+    def _delete_raw(self, *keys):
+        self.cache.delete_many(keys)
+
+    def _find_keys_raw(self, prefix):
+        return []
+
+
+class ThumbnailBackend(base.ThumbnailBackend):
+    def thumbnail_options(self, source, options):
+        """Параметры миниатюры так же, как в get_thumbnail()."""
+        options = dict(options)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        return options
+
+    def thumbnail_file(self, file_, geometry_string, **options):
+        """Файл миниатюры, который создал бы get_thumbnail()."""
+        source = ImageFile(file_)
+        name = self._get_thumbnail_filename(
+            source, geometry_string, self.thumbnail_options(source, options))
+        return ImageFile(name, default.storage)
+
+    def get_ready_thumbnail(self, file_, geometry_string, **options):
+        """Миниатюра из хранилища ключей или None; ничего не создает."""
+        return default.kvstore.get(
+            self.thumbnail_file(file_, geometry_string, **options))
+
+
+def ready_thumbnail(image, variant):
+    geometry, options = settings.POSTS_THUMBNAILS[variant]
+    return default.backend.get_ready_thumbnail(image, geometry, **options)
+
+
+def post_thumbnail(post, variant):
+    """Готовая миниатюра картинки поста или None.
+
+    Если миниатюры нет, генерация ставится в очередь: запись в
+    хранилище могла быть вытеснена из кэша.
+    """
+    if not post.image:
+        return None
+    thumbnail = ready_thumbnail(post.image, variant)
+    if thumbnail is None:
+        schedule_thumbnails(post.pk)
+    return thumbnail
+
+
+def generate_thumbnails(post_id):
+    try:
+        post = Post.objects.filter(pk=post_id).only('image').first()
+        if post is None or not post.image:
+            return
+        created = False
+        for geometry, options in settings.POSTS_THUMBNAILS.values():
+            created |= not default.backend.thumbnail_file(
+                post.image, geometry, **options).exists()
+            get_thumbnail(post.image, geometry, **options)
+        # Карточки и страницы с исходной картинкой вместо миниатюры
+        # устарели: новое updated_at меняет их ключи. Если файлы уже
+        # были и sorl только записал ключи заново, пост не меняется.
+        if created:
+            Post.objects.filter(pk=post.pk).touch()
+    except Exception:
+        logger.exception('Миниатюры поста %s не созданы', post_id)
+    finally:
+        cache.delete(PENDING_KEY.format(post_id))
+
+
+def run_in_worker(post_id):
+    try:
+        generate_thumbnails(post_id)
+    finally:
+        connections.close_all()
+
+
+def schedule_thumbnails(post_id):
+    """Ставит генерацию миниатюр поста в пул потоков.
+
+    При POSTS_THUMBNAIL_WORKERS = 0 миниатюры создаются сразу, в
+    текущем потоке (тесты, management-команды).
+    """
+    global executor
+    if not cache.add(PENDING_KEY.format(post_id), True, PENDING_TIMEOUT):
+        return
+    if not settings.POSTS_THUMBNAIL_WORKERS:
+        generate_thumbnails(post_id)
+        return
+    with executor_lock:
+        if executor is None:
+            executor = ThreadPoolExecutor(settings.POSTS_THUMBNAIL_WORKERS,
+                                          thread_name_prefix='thumbnails')
+    executor.submit(run_in_worker, post_id)
@@ -0,0 +1,153 @@
+"""Лента подписок: посты раскладываются по лентам при публикации.
+
+Для каждого подписчика автора пишется строка TimelineEntry, и лента
+читается по индексу (user, pub_date). Авторам, у которых подписчиков
+больше TIMELINE_FANOUT_MAX_FOLLOWERS, посты не раскладываются: их
+посты добавляются к ленте при чтении. После смены порога ленты
+перестраивает команда rebuild_timeline.
+"""
+from django.conf import settings
+from django.db import connection
+from django.db.models import Subquery
+from django.utils.functional import cached_property
+
+from .models import AuthorStats, Follow, Post, TimelineEntry
+
+
+def fan_out(where, params):
+    """Раскладывает посты, выбранные условием where, по лентам
+    подписчиков их авторов одним INSERT ... SELECT."""
+    quote = connection.ops.quote_name
+    insert = connection.ops.insert_statement(ignore_conflicts=True)
+    suffix = connection.ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{insert} {quote(TimelineEntry._meta.db_table)} '
+            '(user_id, post_id, pub_date) '
+            'SELECT f.user_id, p.id, p.pub_date '
+            f'FROM {quote(Post._meta.db_table)} p '
+            f'JOIN {quote(Follow._meta.db_table)} f '
+            'ON f.author_id = p.author_id '
+            f'LEFT JOIN {quote(AuthorStats._meta.db_table)} s '
+            'ON s.author_id = p.author_id '
+            f'WHERE {where} AND COALESCE(s.followers_count, 0) <= %s '
+            f'{suffix}',
+            [*params, settings.TIMELINE_FANOUT_MAX_FOLLOWERS],
+        )
+
+
+def fan_out_post(post):
+    fan_out('p.id = %s', [post.pk])
+
+
+def fan_out_posts_after(pk):
+    """Раскладывает посты с id больше pk, добавленные через bulk_create."""
+    fan_out('p.id > %s', [pk])
+
+
+def fan_out_author(author_id, user_id=None):
+    """Посты автора в ленту нового подписчика или, без user_id, всех
+    подписчиков - когда автор перестал быть популярным."""
+    if user_id is None:
+        fan_out('p.author_id = %s', [author_id])
+    else:
+        fan_out('p.author_id = %s AND f.user_id = %s', [author_id, user_id])
+
+
+def remove_author(author_id, user_id=None):
+    """Убирает посты автора из ленты user_id или, без него, из лент
+    всех подписчиков - когда автор стал популярным."""
+    entries = TimelineEntry.objects.filter(post__author_id=author_id)
+    if user_id is not None:
+        entries = entries.filter(user_id=user_id)
+    entries.delete()
+
+
+def fanned_out(author_id, followers):
+    """Разложены ли посты автора: последний его пост есть в лентах
+    всех подписчиков. Проверка читает не больше followers строк."""
+    latest = (Post.objects.filter(author_id=author_id)
+              .order_by('-pub_date', '-pk').values('pk')[:1])
+    return (TimelineEntry.objects.filter(post_id=Subquery(latest)).count()
+            >= followers)
+
+
+def sync_author(author_id, followers):
+    """Приводит ленты подписчиков к числу подписчиков автора.
+
+    Сравнивается состояние, а не точный переход через порог: порог
+    мог уменьшиться, а параллельные подписки - перескочить его.
+    """
+    if followers > settings.TIMELINE_FANOUT_MAX_FOLLOWERS:
+        remove_author(author_id)
+    elif followers and not fanned_out(author_id, followers):
+        fan_out_author(author_id)
+
+
+def rebuild():
+    """Убирает из лент посты популярных авторов и раскладывает посты
+    остальных; нужна после смены TIMELINE_FANOUT_MAX_FOLLOWERS."""
+    removed, _ = TimelineEntry.objects.filter(
+        post__author__post_stats__followers_count__gt=(
+            settings.TIMELINE_FANOUT_MAX_FOLLOWERS),
+    ).delete()
+    fan_out('1 = 1', [])
+    return removed, TimelineEntry.objects.count()
+
+
+class FollowFeed:
+    """Лента подписок user с интерфейсом для Paginator.
+
+    Страница собирается из двух упорядоченных по индексам выборок:
+    разложенных постов (TimelineEntry) и постов популярных авторов,
+    которые в TimelineEntry не попадают. Каждая выборка читает не
+    больше конца страницы, поэтому стоимость не зависит от числа
+    подписок.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def popular_author_ids(self):
+        return list(Follow.objects.filter(
+            user=self.user,
+            author__post_stats__followers_count__gt=(
+                settings.TIMELINE_FANOUT_MAX_FOLLOWERS),
+        ).values_list('author_id', flat=True))
+
+    def entries(self):
+        entries = TimelineEntry.objects.filter(user=self.user)
+        if self.popular_author_ids:
+            # Строки, оставшиеся с тех пор, как автор не был популярным,
+            # иначе дали бы дубли с постами, прочитанными напрямую.
+            entries = entries.exclude(
+                post__author_id__in=self.popular_author_ids)
+        return entries
+
+    def popular_posts(self):
+        return Post.objects.filter(author_id__in=self.popular_author_ids)
+
+    def count(self):
+        count = self.entries().count()
+        if self.popular_author_ids:
+            count += self.popular_posts().count()
+        return count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError('FollowFeed supports only slicing')
+        rows = list(self.entries().order_by('-pub_date', '-post_id')
+                    .values_list('pub_date', 'post_id')[:index.stop])
+        if self.popular_author_ids:
+            rows += self.popular_posts().order_by(
+                '-pub_date', '-pk').values_list('pub_date', 'pk')[:index.stop]
+        # Пост попадает на страницу один раз, даже если он есть в обеих
+        # выборках.
+        rows = sorted(set(rows), reverse=True)
+        ids = [pk for pub_date, pk in rows[index]]
+        posts = Post.objects.feed().in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
@@ -1,10 +1,173 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
 from django.http import HttpRequest
-from django.db.models import QuerySet
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from core.db_router import reading_from_replica
+
+CURSOR_PARAM = 'cursor'
+CURSOR_FORWARD = 'n'
+CURSOR_BACKWARD = 'p'
+PAGE_WINDOW = 2
+
+
+class FeedPage(Page):
+    @property
+    def page_window(self):
+        """Номера страниц вокруг текущей вместо полного page_range."""
+        first = max(self.number - PAGE_WINDOW, 1)
+        last = min(self.number + PAGE_WINDOW, self.paginator.num_pages)
+        return range(first, last + 1)
+
+
+class FeedPaginator(Paginator):
+    """Paginator, берущий число записей из кэша или готовым значением.
+
+    count - заранее известное (в том числе приблизительное) число
+    записей, count_key - ключ кэша, под которым хранится результат
+    COUNT(*); ключи сбрасываются при создании и удалении постов.
+    count_timeout по умолчанию берется из POSTS_COUNT_CACHE_TIMEOUT.
+
+    Число, прочитанное с реплики, может быть старше сброса ключа:
+    оно хранится не дольше POSTS_REPLICA_COUNT_CACHE_TIMEOUT, и на это
+    время (плюс отставание реплики) пагинатор может не видеть новых
+    или видеть удаленные посты.
+    """
+
+    def __init__(self, object_list, per_page, count=None, count_key=None,
+                 count_timeout=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.known_count = count
+        self.count_key = count_key
+        self.count_timeout = count_timeout
+
+    @cached_property
+    def count(self):
+        if self.known_count is not None:
+            return self.known_count
+        if self.count_key is None:
+            return super().count
+        count = cache.get(self.count_key)
+        if count is None:
+            count = super().count
+            timeout = (self.count_timeout
+                       or settings.POSTS_COUNT_CACHE_TIMEOUT)
+            if reading_from_replica():
+                timeout = min(timeout,
+                              settings.POSTS_REPLICA_COUNT_CACHE_TIMEOUT)
+            cache.set(self.count_key, count, timeout)
+        return count
+
+    def _get_page(self, *args, **kwargs):
+        return FeedPage(*args, **kwargs)
+
+
+def encode_cursor(post, direction: str) -> str:
+    """Упаковывает ключ (pub_date, id) поста в непрозрачную строку."""
+    raw = f'{direction}{post.pub_date.isoformat()}|{post.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    """Возвращает (direction, pub_date, id) или None для битого курсора."""
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(cursor + padding).decode()
+        direction, raw = raw[0], raw[1:]
+        raw_date, raw_pk = raw.rsplit('|', 1)
+        pub_date, pk = parse_datetime(raw_date), int(raw_pk)
+    except (binascii.Error, UnicodeDecodeError, IndexError, ValueError):
+        return None
+    if direction not in (CURSOR_FORWARD, CURSOR_BACKWARD) or not pub_date:
+        return None
+    return direction, pub_date, pk
+
+
+class CursorPage:
+    """Страница ленты, полученная поиском по ключу (pub_date, id).
+
+    В отличие от Page не знает ни номера страницы, ни общего числа
+    записей: курсоры next_cursor/previous_cursor ведут на соседние
+    страницы без OFFSET и COUNT(*).
+    """
+    paginator = None
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self.has_next_page = has_next
+        self.has_previous_page = has_previous
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self)} objects>'
+
+    def has_next(self):
+        return self.has_next_page
+
+    def has_previous(self):
+        return self.has_previous_page
+
+    def has_other_pages(self):
+        return self.has_next_page or self.has_previous_page
+
+    @property
+    def next_cursor(self):
+        if not self.has_next_page:
+            return None
+        return encode_cursor(self.object_list[-1], CURSOR_FORWARD)
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous_page:
+            return None
+        return encode_cursor(self.object_list[0], CURSOR_BACKWARD)
+
+
+def get_cursor_page(queryset: QuerySet, cursor, per_page: int):
+    queryset = queryset.order_by('-pub_date', '-pk')
+    position = decode_cursor(cursor) if cursor else None
+    if position is None:
+        rows = list(queryset[:per_page + 1])
+        return CursorPage(rows[:per_page], len(rows) > per_page, False)
+    direction, pub_date, pk = position
+    if direction == CURSOR_FORWARD:
+        rows = list(queryset.filter(
+            Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+        )[:per_page + 1])
+        return CursorPage(rows[:per_page], len(rows) > per_page, True)
+    rows = list(queryset.filter(
+        Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk)
+    ).order_by('pub_date', 'pk')[:per_page + 1])
+    if len(rows) <= per_page:
+        # Дошли до начала ленты: отдаем полную первую страницу.
+        return get_cursor_page(queryset, None, per_page)
+    return CursorPage(rows[per_page - 1::-1], True, True)
 
 
-def get_context_page(request: HttpRequest, queryset: QuerySet, pages: int):
-    paginator = Paginator(queryset, pages)
+def get_context_page(request: HttpRequest, queryset: QuerySet, pages: int,
+                     count=None, count_key=None):
+    """Страница ленты. Курсоры работают только с QuerySet, другие
+    последовательности (FollowFeed) листаются по номерам страниц."""
+    cursor = request.GET.get(CURSOR_PARAM)
+    if isinstance(queryset, QuerySet) and (
+            cursor is not None or settings.POSTS_PAGINATION == 'cursor'):
+        return get_cursor_page(queryset, cursor, pages)
+    paginator = FeedPaginator(queryset, pages, count=count,
+                              count_key=count_key)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
@@ -1,26 +1,48 @@
 from django.urls import reverse
 from django.shortcuts import render, get_object_or_404, redirect
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_POST
+from core.db_router import replica_reads
+from core.query_budget import query_budget
+from .cache import (cache_anonymous_page, conditional_page, feed_count_key,
+                    group_freshness, index_freshness, index_modified,
+                    page_cache_stats, post_freshness, profile_freshness)
+from .export import CONTENT_TYPES, FORMATS, export_lines
 from .forms import PostForm
-from .models import Post, Group, User
-from .utils import get_context_page
+from .models import Follow, Post, Group, User, get_posts_count
+from .search import SearchResults
+from .timeline import FollowFeed
+from .utils import FeedPaginator, get_context_page
 
 COUNT_POST_PAGE = 10
 TEXT_SHORT = 30
 
 
+@replica_reads
+@query_budget(3)
+@conditional_page(index_freshness, index_modified)
+@cache_anonymous_page(index_freshness)
 def index(request):
-    posts = Post.objects.all()
-    page_obj = get_context_page(request, posts, COUNT_POST_PAGE)
+    posts = Post.objects.feed()
+    page_obj = get_context_page(request, posts, COUNT_POST_PAGE,
+                                count_key=feed_count_key('index'))
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'posts/index.html', context)
 
 
+@replica_reads
+@query_budget(4)
+@conditional_page(group_freshness)
+@cache_anonymous_page(group_freshness)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    page_obj = get_context_page(request, group.posts.all(), COUNT_POST_PAGE)
+    page_obj = get_context_page(request, group.posts.feed(), COUNT_POST_PAGE,
+                                count_key=feed_count_key('group', group.pk))
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -28,33 +50,61 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@replica_reads
+@query_budget(5)
+@conditional_page(profile_freshness)
+@cache_anonymous_page(profile_freshness)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    author_total_posts = author.posts.all()
-    page_obj = get_context_page(request, author_total_posts, COUNT_POST_PAGE)
+    author = get_object_or_404(User.objects.select_related('post_stats'),
+                               username=username)
+    page_obj = get_context_page(
+        request, author.posts.feed(), COUNT_POST_PAGE,
+        count_key=feed_count_key('author', author.pk)
+    )
+    following = (request.user.is_authenticated
+                 and request.user != author
+                 and author.following.filter(user=request.user).exists())
     context = {
         'author': author,
-        'author_total_posts': author_total_posts,
+        'author_total_posts': get_posts_count(author),
+        'following': following,
         'page_obj': page_obj,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@replica_reads
+@query_budget(3)
+@conditional_page(post_freshness)
+@cache_anonymous_page(post_freshness)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    author_total_posts = post.author.posts.all()
+    post = get_object_or_404(
+        Post.objects.select_related('author__post_stats', 'group'),
+        pk=post_id
+    )
     title = 'Пост: ' + post.text[:TEXT_SHORT]
     context = {
         'post': post,
-        'author_total_posts': author_total_posts,
+        'author_total_posts': get_posts_count(post.author),
         'title': title,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@query_budget(3)
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    paginator = FeedPaginator(SearchResults(query), COUNT_POST_PAGE)
+    context = {
+        'query': query,
+        'page_obj': paginator.get_page(request.GET.get('page')),
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
-    form = PostForm(request.POST or None)
+    form = PostForm(request.POST or None, files=request.FILES or None)
     if not form.is_valid():
         return render(request, 'posts/create_post.html', {'form': form})
     post = form.save(commit=False)
@@ -68,7 +118,8 @@ def post_create(request):
 def post_edit(request, post_id):
     is_edit = True
     post = get_object_or_404(Post, id=post_id)
-    form = PostForm(request.POST or None, instance=post)
+    form = PostForm(request.POST or None, files=request.FILES or None,
+                    instance=post)
     if post.author != request.user:
         return redirect(reverse('posts:profile',
                                 kwargs={'username': request.user}))
@@ -78,3 +129,67 @@ def post_edit(request, post_id):
                         kwargs={'post_id': post_id}))
     return render(request, 'posts/create_post.html',
                   {'form': form, 'is_edit': is_edit, 'post': post})
+
+
+@login_required
+@query_budget(4)
+def follow_index(request):
+    # Число постов не кэшируется: его меняет каждый новый или удаленный
+    # пост любого из авторов, а ключей всех подписчиков не сбросить.
+    page_obj = get_context_page(request, FollowFeed(request.user),
+                                COUNT_POST_PAGE)
+    return render(request, 'posts/follow.html', {'page_obj': page_obj})
+
+
+@login_required
+@require_POST
+def profile_follow(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user:
+        Follow.objects.get_or_create(user=request.user, author=author)
+    return redirect(reverse('posts:profile', kwargs={'username': username}))
+
+
+@login_required
+@require_POST
+def profile_unfollow(request, username):
+    author = get_object_or_404(User, username=username)
+    Follow.objects.filter(user=request.user, author=author).delete()
+    return redirect(reverse('posts:profile', kwargs={'username': username}))
+
+
+@staff_member_required
+def page_cache_statistics(request):
+    return JsonResponse(page_cache_stats())
+
+
+def export_response(posts, data_format, name):
+    """Потоковая выгрузка: строки отдаются по мере чтения из базы."""
+    if data_format not in FORMATS:
+        data_format = FORMATS[0]
+    response = StreamingHttpResponse(export_lines(posts, data_format),
+                                     content_type=CONTENT_TYPES[data_format])
+    response['Content-Disposition'] = (
+        f'attachment; filename="{name}.{data_format}"')
+    return response
+
+
+# Выгрузка читает все посты автора или группы, поэтому доступна только
+# самому автору и персоналу.
+
+@login_required
+def profile_export(request, username):
+    author = get_object_or_404(User, username=username)
+    if request.user != author and not request.user.is_staff:
+        raise PermissionDenied
+    return export_response(author.posts.all(), request.GET.get('format'),
+                           f'posts-{author.username}')
+
+
+@login_required
+def group_export(request, slug):
+    if not request.user.is_staff:
+        raise PermissionDenied
+    group = get_object_or_404(Group, slug=slug)
+    return export_response(group.posts.all(), request.GET.get('format'),
+                           f'posts-{group.slug}')
@@ -45,17 +45,24 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.static_files.StaticFilesMiddleware',
+    'core.server_timing.ServerTimingMiddleware',
+    'core.memory_profiling.MemoryProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.db_router.ReplicaPinMiddleware',
+    'core.query_budget.QueryBudgetMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -63,7 +70,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backend.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -88,8 +95,67 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+        # Соединение переиспользуется запросами потока до 10 минут.
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {
+            # Сколько секунд ждать снятия блокировки записи.
+            'timeout': 20,
+        },
+    },
+    # Локальная замена реплики: второй файл SQLite, который обновляет
+    # manage.py sync_replica. В тестах указывает на тестовую default.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db_replica.sqlite3'),
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {
+            'timeout': 20,
+        },
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
 }
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+# Псевдонимы баз, с которых читают представления с @replica_reads.
+# Пусто - все запросы идут в default.
+DATABASE_REPLICAS = []
+# Сколько секунд после POST браузер читает только из default.
+REPLICA_PIN_SECONDS = 15
+REPLICA_PIN_COOKIE = 'db_primary'
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Ключи миниатюр sorl-thumbnail (THUMBNAIL_CACHE): общие для всех
+    # процессов на сервере, как и файлы в MEDIA_ROOT, и не теряются при
+    # перезапуске. Вытеснение из кэша процесса заставляло бы заново
+    # ставить генерацию в очередь.
+    'thumbnails': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'thumbnail_cache'),
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    },
+}
+
+# PRAGMA для каждого нового соединения SQLite (core.db). WAL позволяет
+# читать во время записи, synchronous = NORMAL в режиме WAL не теряет
+# целостность при сбое процесса. PRAGMA optimize и ANALYZE намеренно
+# не выполняются: см. benchmarks/feed_indexes.py.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 20000,
+    'cache_size': -64 * 1024,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'memory',
+}
+# Проверять постоянные соединения в начале каждого запроса.
+DATABASE_HEALTH_CHECKS = True
 
 
 # Password validation
@@ -129,6 +195,31 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+# collectstatic дописывает к именам хеш содержимого и сохраняет
+# сжатые варианты .gz (и .br при установленном brotli).
+STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+# Отдавать STATIC_ROOT из Django (core.static_files); False, если
+# статику отдает веб-сервер.
+STATIC_SERVE = True
+# Кэширование файлов без хеша в имени, секунд.
+STATIC_CACHE_MAX_AGE = 60
+
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Миниатюры картинок постов (posts.thumbnails): вариант -> (геометрия,
+# параметры sorl-thumbnail). Создаются в фоне после сохранения поста.
+POSTS_THUMBNAILS = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+    'detail': ('1200', {'upscale': False}),
+}
+# Потоков для генерации миниатюр; 0 - создавать сразу в текущем потоке.
+POSTS_THUMBNAIL_WORKERS = 2
+# Ключи миниатюр хранятся только в кэше, без запроса к базе на картинку.
+THUMBNAIL_KVSTORE = 'posts.thumbnails.CacheKVStore'
+THUMBNAIL_CACHE = 'thumbnails'
+THUMBNAIL_BACKEND = 'posts.thumbnails.ThumbnailBackend'
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -136,4 +227,50 @@ LOGIN_REDIRECT_URL = 'posts:index'
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
-CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
\ No newline at end of file
+CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+# Режим пагинации лент: 'page' - номера страниц (?page=),
+# 'cursor' - поиск по ключу (pub_date, id) без OFFSET и COUNT(*).
+POSTS_PAGINATION = 'page'
+# Сколько секунд хранить в кэше число постов ленты для пагинатора.
+POSTS_COUNT_CACHE_TIMEOUT = 60 * 15
+# То же для числа, прочитанного с реплики: сброс ключа при записи не
+# ждет реплику, и отставшее число держится не дольше этого срока.
+POSTS_REPLICA_COUNT_CACHE_TIMEOUT = 10
+# Сколько секунд хранить отрисованную карточку поста.
+POSTS_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+# Кэш целых страниц лент и постов для анонимных посетителей, секунд;
+# 0 - выключен. Ключ включает свежесть страницы, прочитанную из базы
+# (posts.cache.conditional_page), поэтому запись в любом процессе
+# сразу меняет ключ; срок только ограничивает память под старые ключи.
+POSTS_PAGE_CACHE_TIMEOUT = 0
+# Сколько секунд хранить тело RSS/Atom-ленты; ключ устроен так же.
+POSTS_FEED_CACHE_TIMEOUT = 60 * 60
+# Число постов в RSS/Atom-ленте.
+POSTS_FEED_SIZE = 20
+# Авторам с большим числом подписчиков посты не раскладываются по
+# лентам подписок при публикации, а добавляются при чтении ленты.
+TIMELINE_FANOUT_MAX_FOLLOWERS = 1000
+
+# Проверка бюджета SQL-запросов представлений (core.query_budget):
+# 'log' - предупреждение в лог, 'raise' - ошибка, None - выключено.
+# Не включать в production.
+QUERY_BUDGET_MODE = 'log' if DEBUG else None
+# Бюджет для представлений без @query_budget; None - не проверять.
+QUERY_BUDGET_DEFAULT = None
+
+# Заголовок Server-Timing и строка лога core.server_timing (INFO)
+# со временем SQL, шаблонов и Python для каждого запроса.
+SERVER_TIMING = True
+
+# Профили cProfile, снятые сотрудниками по ?_profile или X-Profile: 1
+# (core.profiling); хранятся последние PROFILE_MAX_CAPTURES.
+PROFILE_PARAM = '_profile'
+PROFILE_DIR = os.path.join(BASE_DIR, 'profiles')
+PROFILE_MAX_CAPTURES = 50
+
+# Пик памяти и места выделений (tracemalloc) для каждого запроса,
+# core.memory_profiling; сильно замедляет ответы, только для отладки.
+MEMORY_PROFILING = False
+# Сколько мест выделений показывать в отчете.
+MEMORY_PROFILING_TOP = 10